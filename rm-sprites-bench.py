@@ -0,0 +1,635 @@
+"""
+Offline benchmarks for rm-sprites.py. Builds a synthetic customsprites repo and credits csv, points the script at
+an in-memory stand-in for the Sheets API, and times whole removals. Nothing here touches the network or a real repo
+
+    python rm-sprites-bench.py --rows 10000 100000 --scenarios sole collabs chains --latency 0.05
+"""
+
+import argparse
+import collections
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import random
+import re
+import shutil
+import tempfile
+import threading
+import time
+
+import httplib2
+from googleapiclient.errors import HttpError
+
+# ======= Defaults, all of these can be set from the command line =======
+
+BENCH_ROWS = [10_000]
+BENCH_SCENARIOS = ["sole", "collabs", "chains"]
+
+# Roughly how many sprites the removed user has, as a share of all rows
+BENCH_TARGET_SHARE = 0.01
+
+# Share of sprites that have a row in the dex response sheet
+BENCH_DEX_SHARE = 0.7
+
+BENCH_SEED = 1234
+
+BENCH_TARGET_USER = "bench target"
+
+# ======= DO NOT MODIFY BELOW HERE =======
+
+RM_SPRITES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "rm-sprites.py")
+
+DEX_SPREADSHEET_ID = "bench-dex"
+DEX_RESPONSE_SHEET_ID = 101
+CREDITS_SPREADSHEET_ID = "bench-credits"
+CREDITS_CREDIT_SHEET_ID = 202
+
+# Whole rows ("5:5") leave the columns out
+A1_RANGE_REGEX = re.compile(r"^(?:'?(?P<title>[^'!]+)'?!)?(?P<start_col>[A-Z]*)(?P<start_row>[0-9]+)(?::(?P<end_col>[A-Z]*)(?P<end_row>[0-9]*))?$")
+
+READ_METHODS = ("get", "batchGet", "batchGetByDataFilter")
+
+# The only formulas the fake can work out are the ones rm-sprites.py writes for targeted lookups
+LOOKUP_FORMULA_REGEX = re.compile(r'^=IFERROR\((?:(?P<join>TEXTJOIN\(",",TRUE,)|MAX\()FILTER\(ROW\((?P<range>[^()]+)\),(?P<condition>.+)\)\),(?:""|0)\)$')
+MATCH_CONDITION_REGEX = re.compile(r'\(TO_TEXT\((?P<range>[^()]+)\)="(?P<value>[^"]*)"\)')
+
+
+def main():
+    parser = argparse.ArgumentParser(
+                    prog='SpriteEraserBench',
+                    description='Times rm-sprites.py removals against a synthetic repo and a fake Sheets API.')
+    parser.add_argument('--rows', type=int, nargs='+', default=BENCH_ROWS, help='Number of credit rows to generate. Several sizes can be given')
+    parser.add_argument('--scenarios', nargs='+', default=BENCH_SCENARIOS, choices=sorted(SCENARIOS.keys()), help='Which removals to time')
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds every fake Sheets call takes')
+    parser.add_argument('--quota-per-minute', type=int, default=None, help='Read and write quota of the fake API. The script is paced to the same quota. Default is no quota')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Share of fake Sheets calls that fail with a 503')
+    parser.add_argument('--backoff-base', type=float, default=0.01, help='Overrides the retry backoff base (seconds) so failed calls don\'t stall the benchmark')
+    parser.add_argument('--backup', action='store_true', help='Time the removals with backups turned on (-b)')
+    parser.add_argument('--restore', action='store_true', help='After each removal (backed up, as with --backup), time restoring the backup and check everything is back the way it was')
+    parser.add_argument('--warm', action='store_true', help='Fetch the sheets once before timing, so the removal starts from saved sheet snapshots like a back to back run would')
+    parser.add_argument('--only', type=int, default=None, help='Only remove this many of the target\'s sprites (with -o), like a small targeted removal')
+    parser.add_argument('--all-files', action='store_true', help='Write a sprite file for every row, not just the fusions the removal touches')
+    parser.add_argument('--seed', type=int, default=BENCH_SEED)
+    parser.add_argument('--keep', action='store_true', help='Don\'t delete the generated repos afterwards')
+    parser.add_argument('--verbose', action='store_true', help='Show the output of rm-sprites.py')
+    parser.add_argument('--output', help='Write the results here as JSON instead of printing them')
+    args = parser.parse_args()
+
+    results = []
+    for num_rows in args.rows:
+        for scenario in args.scenarios:
+            result = run_scenario(scenario, num_rows, args)
+            print(f"{scenario:>8} {num_rows:>8} rows: {result['wall_seconds']:.2f}s, {result['sheet_calls']['total']} sheet calls "
+                  f"({result['sheet_calls']['reads']} reads, {result['sheet_calls']['writes']} writes), {result['csv_rewrites']} csv rewrites"
+                  f"{'' if result['consistent'] else ' INCONSISTENT'}")
+            if "restore" in result:
+                restore = result["restore"]
+                print(f"{'restore':>8} {num_rows:>8} rows: {restore['wall_seconds']:.2f}s, {restore['sheet_calls']['total']} sheet calls "
+                      f"({restore['sheet_calls']['reads']} reads, {restore['sheet_calls']['writes']} writes), {restore['csv_rewrites']} csv rewrites"
+                      f"{'' if restore['matches_original'] else ' NOT RESTORED'}")
+            results.append(result)
+
+    if args.output is not None:
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            json.dump(results, output_file, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+
+
+def load_rm_sprites(path: str = None):
+    """
+    rm-sprites.py isn't importable by name (the dash), so load it straight from the file
+    """
+    spec = importlib.util.spec_from_file_location("rm_sprites", RM_SPRITES_PATH if path is None else path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+# === Scenarios ===
+
+class Scenario:
+    """
+    How a synthetic repo is laid out: how long variant chains get, and how the target user's sprites are spread
+    """
+    def __init__(self, description: str, min_variants: int, max_variants: int, collab_share: float, low_variant_bias: bool, include_collabs: bool):
+        self.description = description
+        self.min_variants = min_variants
+        self.max_variants = max_variants
+        self.collab_share = collab_share
+        self.low_variant_bias = low_variant_bias
+        self.include_collabs = include_collabs
+
+
+SCENARIOS = {
+    "sole": Scenario("Sole author sprites spread over the whole dex", 1, 6, 0.05, False, False),
+    "collabs": Scenario("Mostly collabs, removed with -c", 1, 6, 0.8, False, True),
+    "chains": Scenario("Low variants of long chains, so every sprite above them gets renamed", 20, 60, 0.05, True, False),
+}
+
+
+def run_scenario(scenario_name: str, num_rows: int, args) -> dict:
+    """
+    Generates a repo, removes the target user from it and reports what that cost. Every scenario gets a freshly
+    loaded copy of the script, so its profiler and request counters only cover this run
+    """
+    rm_sprites = load_rm_sprites()
+    scenario = SCENARIOS[scenario_name]
+    repo_root = tempfile.mkdtemp(prefix=f"bench-{scenario_name}-")
+    try:
+        generated = make_synthetic_repo(repo_root, num_rows, scenario, args.seed, args.all_files)
+        service = FakeSheetsService(args.latency, args.quota_per_minute, args.error_rate, args.seed)
+        service.add_sheet(DEX_SPREADSHEET_ID, DEX_RESPONSE_SHEET_ID, "RESPONSES", generated["dex_rows"])
+        service.add_sheet(CREDITS_SPREADSHEET_ID, CREDITS_CREDIT_SHEET_ID, "Credits", generated["credits_rows"])
+        configure_rm_sprites(rm_sprites, repo_root, service, args)
+
+        if args.warm:
+            # A separate copy of the script, so the warm up doesn't show in the profile or request counters
+            warm_up = load_rm_sprites()
+            configure_rm_sprites(warm_up, repo_root, service, args)
+            with contextlib.redirect_stdout(io.StringIO()):
+                warm_up.get_sheet_indexes()
+            service.reset_counters()
+
+        csv_path = os.path.join(repo_root, "Sprite Credits.csv")
+        csv_rewrites = count_calls(rm_sprites, "_write_file_atomically", lambda file_path, *_: file_path == csv_path)
+        if args.restore:
+            original = repo_state(rm_sprites, service, csv_path)
+
+        output = io.StringIO()
+        start = time.perf_counter()
+        with contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(output):
+            only_delete = generated["sole_target_sprites"][:args.only] if args.only is not None else None
+            rm_sprites.user_sprite_deletion(BENCH_TARGET_USER, include_collabs=scenario.include_collabs, only_delete=only_delete, preserve_data=args.backup or args.restore)
+        wall_seconds = time.perf_counter() - start
+        scheduler_counters = rm_sprites.get_sheet_scheduler().counters
+
+        rows_after = rm_sprites.CreditsStore(csv_path).df
+        result = {
+            "scenario": scenario_name,
+            "description": scenario.description,
+            "rows": num_rows,
+            "target_sprites": generated["target_sprites"],
+            "removed_rows": num_rows - len(rows_after),
+            "wall_seconds": round(wall_seconds, 4),
+            "sheet_calls": service.call_summary(),
+            "cells_read": service.cells_read,
+            "cells_written": service.cells_written,
+            "rows_deleted": service.rows_deleted,
+            "injected_errors": service.injected_errors,
+            "retries": scheduler_counters["retries"],
+            "throttle_wait_seconds": round(scheduler_counters["throttle_wait_seconds"], 4),
+            "backoff_seconds": round(scheduler_counters["backoff_seconds"], 4),
+            "csv_rewrites": csv_rewrites["count"],
+            "consistent": sheets_match_csv(service, rows_after["filename"].tolist()),
+            "profile": {name: phase["seconds"] for name, phase in rm_sprites.get_profiler().report()["phases"].items()},
+        }
+
+        if args.restore:
+            service.reset_counters()
+            csv_rewrites["count"] = 0
+            start = time.perf_counter()
+            with contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(output):
+                rm_sprites.restore_backups([BENCH_TARGET_USER])
+            result["restore"] = {
+                "wall_seconds": round(time.perf_counter() - start, 4),
+                "sheet_calls": service.call_summary(),
+                "cells_read": service.cells_read,
+                "cells_written": service.cells_written,
+                "csv_rewrites": csv_rewrites["count"],
+                "restored_rows": len(rm_sprites.CreditsStore(csv_path).df) - len(rows_after),
+                "matches_original": repo_state(rm_sprites, service, csv_path) == original,
+            }
+        return result
+    finally:
+        if not args.keep:
+            shutil.rmtree(repo_root, ignore_errors=True)
+
+
+def configure_rm_sprites(rm_sprites, repo_root: str, service: "FakeSheetsService", args):
+    """
+    Fills in the config section of rm-sprites.py for a generated repo, the same way a user would edit it
+    """
+    rm_sprites.REPO_PATH = repo_root
+    rm_sprites.REMOVED_SPRITES_FOLDER = os.path.join(repo_root, "Removed")
+    rm_sprites.CACHE_FOLDER = os.path.join(repo_root, ".cache")
+    rm_sprites.REMOVAL_JOURNAL_PATH = os.path.join(repo_root, "removal-journal.jsonl")
+    rm_sprites.DEX_SPREADSHEET_ID = DEX_SPREADSHEET_ID
+    rm_sprites.DEX_RESPONSE_SHEET_ID = DEX_RESPONSE_SHEET_ID
+    rm_sprites.DEX_RESPONSE_SHEET_NAME = "RESPONSES"
+    rm_sprites.DEX_SHEET_FUSION_NAME_COL = "D"
+    rm_sprites.CREDITS_SPREADSHEET_ID = CREDITS_SPREADSHEET_ID
+    rm_sprites.CREDITS_CREDIT_SHEET_ID = CREDITS_CREDIT_SHEET_ID
+    rm_sprites.CREDITS_CREDIT_SHEET_NAME = "Credits"
+    rm_sprites.CREDITS_SHEET_FUSION_NAME_COL = "C"
+    rm_sprites.START_DELAY_SECONDS = 0
+    rm_sprites.SHEETS_BACKOFF_BASE_SECONDS = args.backoff_base
+    rm_sprites.SHEETS_BACKOFF_MAX_SECONDS = args.backoff_base * 64
+    # Without a quota the pacing is opened right up, so the numbers show the script's own cost
+    quota = args.quota_per_minute if args.quota_per_minute is not None else 1_000_000_000
+    rm_sprites.SHEETS_READ_REQUESTS_PER_MINUTE = quota
+    rm_sprites.SHEETS_WRITE_REQUESTS_PER_MINUTE = quota
+    rm_sprites.use_sheets_service(service)
+
+
+def count_calls(module, function_name: str, predicate) -> dict:
+    """
+    Wraps a module level function so calls matching the predicate are counted
+    """
+    counter = {"count": 0}
+    original = getattr(module, function_name)
+
+    def counted(*args, **kwargs):
+        if predicate(*args, **kwargs):
+            counter["count"] += 1
+        return original(*args, **kwargs)
+
+    counted.__wrapped__ = original
+    setattr(module, function_name, counted)
+    return counter
+
+
+def sheets_match_csv(service: "FakeSheetsService", csv_filenames: list) -> bool:
+    """
+    After a removal, the credits sheet should list exactly the csv's sprites and the dex sheet only sprites that exist
+    """
+    credits_names = [name for name in service.column(CREDITS_SPREADSHEET_ID, CREDITS_CREDIT_SHEET_ID, "C")[1:] if name != ""]
+    dex_names = [name[:-4] for name in service.column(DEX_SPREADSHEET_ID, DEX_RESPONSE_SHEET_ID, "D")[2:] if name != ""]
+    return sorted(credits_names) == sorted(csv_filenames) and set(dex_names) <= set(csv_filenames)
+
+
+def repo_state(rm_sprites, service: "FakeSheetsService", csv_path: str) -> tuple:
+    """
+    Everything a removal and restore should put back the way it was: the csv rows, the sprite files and both
+    sheets' rows. Order isn't kept (restored rows go in at the bottom), so each one is sorted
+    """
+    csv_rows = sorted(tuple(str(cell) for cell in row) for row in rm_sprites.CreditsStore(csv_path).df.fillna("").values.tolist())
+    sprite_files = {}
+    for sprite_dir in rm_sprites.SPRITE_DIRS:
+        for file_name in os.listdir(os.path.join(rm_sprites.REPO_PATH, sprite_dir)):
+            with open(os.path.join(rm_sprites.REPO_PATH, sprite_dir, file_name), "rb") as sprite_file:
+                sprite_files[os.path.join(sprite_dir, file_name)] = sprite_file.read()
+
+    def sheet_rows(spreadsheet_id: str, sheet_id: int, num_headers: int) -> list:
+        rows = [list(row) for row in service.sheets[spreadsheet_id][sheet_id][1][num_headers:]]
+        for row in rows:
+            while len(row) > 0 and row[-1] == "":
+                row.pop()
+        return sorted(row for row in rows if len(row) > 0)
+
+    return (csv_rows, sprite_files, sheet_rows(DEX_SPREADSHEET_ID, DEX_RESPONSE_SHEET_ID, 2), sheet_rows(CREDITS_SPREADSHEET_ID, CREDITS_CREDIT_SHEET_ID, 1))
+
+
+# === Synthetic repos ===
+
+def make_synthetic_repo(repo_root: str, num_rows: int, scenario: Scenario, seed: int = BENCH_SEED, all_files: bool = False) -> dict:
+    """
+    Writes a customsprites-like repo: Sprite Credits.csv with num_rows sprites, and the sprite files. Also returns
+    the matching rows for the dex response and credits sheets. Only the fusions the target user has a sprite in get
+    files unless all_files is set, since those are the only ones a removal reads or moves
+    """
+    rng = random.Random(seed)
+    authors = [f"artist {num}" for num in range(max(10, num_rows // 20))]
+    author_weights = [1 / (rank + 1) for rank in range(len(authors))]
+
+    rows = []
+    touched_fusions = set()
+    used_names = set()
+    while len(rows) < num_rows:
+        fusion_name = _random_fusion_name(rng, used_names)
+        num_variants = min(rng.randint(scenario.min_variants, scenario.max_variants), num_rows - len(rows))
+        for variant in range(num_variants):
+            # In the chains scenario the target mostly owns the bottom of long chains, so everything above gets renamed
+            target_chance = BENCH_TARGET_SHARE * (4 if variant < num_variants // 4 else 0) if scenario.low_variant_bias else BENCH_TARGET_SHARE
+            if rng.random() < target_chance:
+                touched_fusions.add(fusion_name)
+                if rng.random() < scenario.collab_share:
+                    other_author = rng.choices(authors, author_weights)[0]
+                    author = f"{other_author} & {BENCH_TARGET_USER}" if rng.random() < 0.5 else f"{BENCH_TARGET_USER} & {other_author}"
+                elif rng.random() < 0.05:
+                    author = f"{BENCH_TARGET_USER} & Game Freak"
+                else:
+                    author = BENCH_TARGET_USER
+            else:
+                author = rng.choices(authors, author_weights)[0]
+            rows.append((fusion_name + _variant_letters(variant), author))
+
+    os.makedirs(os.path.join(repo_root, "CustomBattlers"), exist_ok=True)
+    os.makedirs(os.path.join(repo_root, "Other", "BaseSprites"), exist_ok=True)
+    with open(os.path.join(repo_root, "Sprite Credits.csv"), "w", encoding="utf-8", newline="") as csv_file:
+        for filename, author in rows:
+            csv_file.write(f"{filename},{author},main,\n")
+
+    for filename, _ in rows:
+        fusion_name = re.match(r"[0-9]+(\.[0-9]+)?", filename).group(0)
+        if all_files or fusion_name in touched_fusions:
+            sprite_dir = "CustomBattlers" if "." in filename else os.path.join("Other", "BaseSprites")
+            with open(os.path.join(repo_root, sprite_dir, f"{filename}.png"), "wb") as sprite_file:
+                sprite_file.write(filename.encode("utf-8"))
+
+    # Responses come in whenever people submit them, so the sheets aren't in csv order
+    dex_rows = [["timestamp", "", "", "fusion"], ["", "", "", ""]]
+    dex_rows += [["2024-01-01", "entry", "author", f"{filename}.png"] for filename, _ in rows if rng.random() < BENCH_DEX_SHARE]
+    credits_rows = [["author", "status", "sprite"]] + [[author, "main", filename] for filename, author in rows]
+    dex_body = dex_rows[2:]
+    rng.shuffle(dex_body)
+    credits_body = credits_rows[1:]
+    rng.shuffle(credits_body)
+
+    return {
+        "dex_rows": dex_rows[:2] + dex_body,
+        "credits_rows": credits_rows[:1] + credits_body,
+        "target_sprites": sum(1 for _, author in rows if BENCH_TARGET_USER in author),
+        "sole_target_sprites": [filename for filename, author in rows if author == BENCH_TARGET_USER],
+    }
+
+
+def _random_fusion_name(rng: random.Random, used_names: set) -> str:
+    while True:
+        # A few percent are base sprites (just a number), the rest are head.body fusions
+        if rng.random() < 0.03:
+            fusion_name = str(rng.randint(1, 2000))
+        else:
+            fusion_name = f"{rng.randint(1, 2000)}.{rng.randint(1, 2000)}"
+        if fusion_name not in used_names:
+            used_names.add(fusion_name)
+            return fusion_name
+
+
+def _variant_letters(number: int) -> str:
+    letters = []
+    while number > 0:
+        number, remainder = divmod(number - 1, 26)
+        letters.append(chr(remainder + 97))
+    return "".join(reversed(letters))
+
+
+# === Fake Sheets API ===
+
+class FakeSheetsService:
+    """
+    In-memory stand-in for a Sheets v4 service. Supports the calls rm-sprites.py makes: values().get,
+    values().batchGetByDataFilter, values().batchUpdate, values().update, values().clear, and batchUpdate with
+    updateCells, insertDimension, deleteDimension and addSheet. Cells holding the lookup formulas rm-sprites.py writes are worked out
+    when they're read, like the real thing would. Every call can be made to take a while, to run into a per-minute quota (429), or to fail at
+    random (503), and every call is counted
+    """
+    def __init__(self, latency: float = 0.0, quota_per_minute: int = None, error_rate: float = 0.0, seed: int = BENCH_SEED):
+        self.latency = latency
+        self.quota_per_minute = quota_per_minute
+        self.error_rate = error_rate
+        self.sheets = {}  # spreadsheet id -> {sheet id: [title, rows]}
+        self.calls = collections.Counter()
+        self.cells_read = 0
+        self.cells_written = 0
+        self.rows_deleted = 0
+        self.injected_errors = collections.Counter()
+        self._recent_calls = {"read": collections.deque(), "write": collections.deque()}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def add_sheet(self, spreadsheet_id: str, sheet_id: int, title: str, rows: list):
+        self.sheets.setdefault(spreadsheet_id, {})[sheet_id] = [title, [list(row) for row in rows]]
+
+    def column(self, spreadsheet_id: str, sheet_id: int, col_letter: str) -> list:
+        col_index = _col_index(col_letter)
+        return [row[col_index] if col_index < len(row) else "" for row in self.sheets[spreadsheet_id][sheet_id][1]]
+
+    def reset_counters(self):
+        self.calls.clear()
+        self.cells_read = 0
+        self.cells_written = 0
+        self.rows_deleted = 0
+        self.injected_errors.clear()
+
+    def call_summary(self) -> dict:
+        summary = dict(self.calls)
+        summary["reads"] = sum(count for method, count in self.calls.items() if method.split(".")[-1] in READ_METHODS)
+        summary["writes"] = sum(self.calls.values()) - summary["reads"]
+        summary["total"] = sum(self.calls.values())
+        return summary
+
+    # The service, spreadsheets() and values() are all the same object here
+    def spreadsheets(self):
+        return self
+
+    def values(self):
+        return self
+
+    def get(self, spreadsheetId: str, range: str, **kwargs):
+        def run():
+            return {"range": range, **self._read_range(spreadsheetId, range)}
+        return FakeRequest(self, "sheets.spreadsheets.values.get", run)
+
+    def batchGetByDataFilter(self, spreadsheetId: str, body: dict):
+        def run():
+            return {"valueRanges": [{"valueRange": self._read_range(spreadsheetId, data_filter["a1Range"]), "dataFilters": [data_filter]}
+                                    for data_filter in body["dataFilters"]]}
+        return FakeRequest(self, "sheets.spreadsheets.values.batchGetByDataFilter", run)
+
+    def update(self, spreadsheetId: str, range: str, body: dict, valueInputOption: str = "RAW", includeValuesInResponse: bool = False, **kwargs):
+        def run():
+            self._write_range(spreadsheetId, range, body.get("values", []))
+            response = {"spreadsheetId": spreadsheetId, "updatedRange": range}
+            if includeValuesInResponse:
+                response["updatedData"] = {"range": range, **self._read_range(spreadsheetId, range)}
+            return response
+        return FakeRequest(self, "sheets.spreadsheets.values.update", run)
+
+    def clear(self, spreadsheetId: str, range: str, body: dict = None):
+        def run():
+            rows, start_col, end_col, start_row, end_row = self._parse_range(spreadsheetId, range)
+            for row in rows[start_row - 1:end_row]:
+                # Can't use range() in here, the API's argument name shadows it
+                row[start_col:end_col + 1] = [""] * len(row[start_col:end_col + 1])
+            return {"spreadsheetId": spreadsheetId, "clearedRange": range}
+        return FakeRequest(self, "sheets.spreadsheets.values.clear", run)
+
+    def batchUpdate(self, spreadsheetId: str, body: dict):
+        # spreadsheets().batchUpdate and values().batchUpdate share a name, tell them apart by the body
+        if "requests" not in body:
+            def run_values():
+                for value_range in body["data"]:
+                    values = value_range["values"]
+                    if value_range.get("majorDimension") == "COLUMNS":
+                        values = [list(row) for row in zip(*values)]
+                    self._write_range(spreadsheetId, value_range["range"], values)
+                return {"spreadsheetId": spreadsheetId, "totalUpdatedCells": sum(len(row) for vr in body["data"] for row in vr["values"])}
+            return FakeRequest(self, "sheets.spreadsheets.values.batchUpdate", run_values)
+
+        def run():
+            for request in body["requests"]:
+                if "updateCells" in request:
+                    self._update_cells(spreadsheetId, request["updateCells"])
+                elif "deleteDimension" in request:
+                    self._delete_dimension(spreadsheetId, request["deleteDimension"])
+                elif "insertDimension" in request:
+                    self._insert_dimension(spreadsheetId, request["insertDimension"])
+                elif "addSheet" in request:
+                    properties = request["addSheet"]["properties"]
+                    if any(title == properties["title"] for title, _ in self.sheets[spreadsheetId].values()):
+                        raise _http_error(400, f"A sheet with the name \"{properties['title']}\" already exists")
+                    self.add_sheet(spreadsheetId, properties.get("sheetId", max(self.sheets[spreadsheetId].keys()) + 1), properties["title"], [])
+                else:
+                    raise ValueError(f"Fake Sheets doesn't know how to do {list(request.keys())}")
+            return {"spreadsheetId": spreadsheetId, "replies": [{} for _ in body["requests"]]}
+        return FakeRequest(self, "sheets.spreadsheets.batchUpdate", run)
+
+    def _execute(self, request: "FakeRequest"):
+        time.sleep(self.latency)
+        kind = "read" if request.methodId.split(".")[-1] in READ_METHODS else "write"
+        with self._lock:
+            self.calls[request.methodId.replace("sheets.spreadsheets.", "")] += 1
+            if self.quota_per_minute is not None:
+                now = time.monotonic()
+                recent = self._recent_calls[kind]
+                while len(recent) > 0 and now - recent[0] > 60:
+                    recent.popleft()
+                if len(recent) >= self.quota_per_minute:
+                    self.injected_errors[429] += 1
+                    raise _http_error(429, "Quota exceeded")
+                recent.append(now)
+            if self.error_rate > 0 and self._rng.random() < self.error_rate:
+                self.injected_errors[503] += 1
+                raise _http_error(503, "The service is currently unavailable")
+            return request.run()
+
+    def _sheet(self, spreadsheet_id: str, title: str) -> list:
+        sheets = self.sheets[spreadsheet_id]
+        if title is None:
+            # No sheet name means the first sheet
+            return next(iter(sheets.values()))[1]
+        for sheet_title, rows in sheets.values():
+            if sheet_title == title:
+                return rows
+        raise _http_error(400, f"Unable to parse range: {title}")
+
+    def _parse_range(self, spreadsheet_id: str, a1_range: str) -> tuple:
+        match = A1_RANGE_REGEX.match(a1_range)
+        if match is None:
+            raise _http_error(400, f"Unable to parse range: {a1_range}")
+        rows = self._sheet(spreadsheet_id, match.group("title"))
+        start_row = int(match.group("start_row"))
+        if match.group("start_col") == "":
+            # Whole rows ("5:5"). Only as wide as the rows asked for, the rest of the sheet doesn't matter
+            end_row = int(match.group("end_row") or start_row)
+            return rows, 0, max((len(row) for row in rows[start_row - 1:end_row]), default=0), start_row, end_row
+        end_col = match.group("end_col") or match.group("start_col")
+        if match.group("end_col") is None:
+            end_row = start_row
+        else:
+            end_row = int(match.group("end_row")) if match.group("end_row") else None
+        return rows, _col_index(match.group("start_col")), _col_index(end_col), start_row, end_row
+
+    def _read_range(self, spreadsheet_id: str, a1_range: str) -> dict:
+        rows, start_col, end_col, start_row, end_row = self._parse_range(spreadsheet_id, a1_range)
+        values = []
+        for row in rows[start_row - 1:end_row]:
+            cells = [self._evaluate(spreadsheet_id, cell) if cell.startswith("=") else cell for cell in row[start_col:end_col + 1]]
+            # Like the real API, trailing blanks are dropped from rows and blank rows at the end are dropped entirely
+            while len(cells) > 0 and cells[-1] == "":
+                cells = cells[:-1]
+            values.append(cells)
+        while len(values) > 0 and values[-1] == []:
+            values.pop()
+        self.cells_read += sum(len(cells) for cells in values)
+        return {"range": a1_range, "majorDimension": "ROWS", "values": values} if len(values) > 0 else {"range": a1_range, "majorDimension": "ROWS"}
+
+    def _evaluate(self, spreadsheet_id: str, formula: str):
+        """
+        Works out a lookup formula: the rows of a column matching some values (joined with commas), or the last
+        row with anything in it
+        """
+        match = LOOKUP_FORMULA_REGEX.match(formula)
+        if match is None:
+            raise ValueError(f"Fake Sheets can't work out {formula}")
+        rows, col_index, _, start_row, end_row = self._parse_range(spreadsheet_id, match.group("range"))
+        column = [(start_row + offset, row[col_index] if col_index < len(row) else "") for offset, row in enumerate(rows[start_row - 1:end_row])]
+        if match.group("condition") == f'{match.group("range")}<>""':
+            matched = [row for row, value in column if value != ""]
+        else:
+            wanted = {condition.group("value") for condition in MATCH_CONDITION_REGEX.finditer(match.group("condition"))}
+            matched = [row for row, value in column if value in wanted]
+        if match.group("join") is not None:
+            return ",".join(str(row) for row in matched)
+        return max(matched) if len(matched) > 0 else 0
+
+    def _write_range(self, spreadsheet_id: str, a1_range: str, values: list):
+        rows, start_col, _, start_row, _ = self._parse_range(spreadsheet_id, a1_range)
+        for row_offset, row_values in enumerate(values):
+            for col_offset, value in enumerate(row_values):
+                self._set_cell(rows, start_row - 1 + row_offset, start_col + col_offset, value)
+
+    def _update_cells(self, spreadsheet_id: str, update: dict):
+        cell_range = update["range"]
+        rows = self._sheet_by_id(spreadsheet_id, cell_range["sheetId"])
+        for row_offset, row_data in enumerate(update["rows"]):
+            for col_offset, cell in enumerate(row_data.get("values", [])):
+                # Everything is kept as text here, the way a formatted read would show it
+                value = next(iter(cell.get("userEnteredValue", {"stringValue": ""}).values()))
+                self._set_cell(rows, cell_range["startRowIndex"] + row_offset, cell_range["startColumnIndex"] + col_offset,
+                               str(value).upper() if isinstance(value, bool) else str(value))
+
+    def _delete_dimension(self, spreadsheet_id: str, delete: dict):
+        dimension_range = delete["range"]
+        if dimension_range["dimension"] != "ROWS":
+            raise ValueError("Fake Sheets only deletes rows")
+        rows = self._sheet_by_id(spreadsheet_id, dimension_range["sheetId"])
+        deleted = rows[dimension_range["startIndex"]:dimension_range["endIndex"]]
+        del rows[dimension_range["startIndex"]:dimension_range["endIndex"]]
+        self.rows_deleted += len(deleted)
+
+    def _insert_dimension(self, spreadsheet_id: str, insert: dict):
+        dimension_range = insert["range"]
+        if dimension_range["dimension"] != "ROWS":
+            raise ValueError("Fake Sheets only inserts rows")
+        rows = self._sheet_by_id(spreadsheet_id, dimension_range["sheetId"])
+        while len(rows) < dimension_range["startIndex"]:
+            rows.append([])
+        rows[dimension_range["startIndex"]:dimension_range["startIndex"]] = [[] for _ in range(dimension_range["endIndex"] - dimension_range["startIndex"])]
+
+    def _sheet_by_id(self, spreadsheet_id: str, sheet_id) -> list:
+        try:
+            return self.sheets[spreadsheet_id][sheet_id][1]
+        except KeyError:
+            raise _http_error(400, f"No grid with id: {sheet_id}")
+
+    def _set_cell(self, rows: list, row_index: int, col_index: int, value: str):
+        while len(rows) <= row_index:
+            rows.append([])
+        row = rows[row_index]
+        while len(row) <= col_index:
+            row.append("")
+        row[col_index] = value
+        self.cells_written += 1
+
+
+class FakeRequest:
+    """
+    What the fake service hands back instead of an HttpRequest. Nothing happens until execute()
+    """
+    def __init__(self, service: FakeSheetsService, method_id: str, run):
+        self.service = service
+        self.methodId = method_id
+        self.run = run
+
+    def execute(self, http=None, num_retries: int = 0):
+        return self.service._execute(self)
+
+
+def _http_error(status: int, message: str) -> HttpError:
+    content = json.dumps({"error": {"code": status, "message": message}}).encode("utf-8")
+    return HttpError(httplib2.Response({"status": status}), content)
+
+
+def _col_index(col_letter: str) -> int:
+    col_index = 0
+    for char in col_letter:
+        col_index = col_index * 26 + (ord(char) - 64)
+    return col_index - 1
+
+
+if __name__ == "__main__":
+    main()
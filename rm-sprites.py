@@ -1,12 +1,38 @@
 import argparse
+import bisect
+import collections
+import concurrent.futures
+import contextlib
+import copy
 import datetime
+import difflib
+import email.utils
+import gzip
+import hashlib
+import json
 import os
 import pandas
+import random
 import re
+import shlex
+import sys
 import time
 import shutil
-
+import tempfile
+import threading
+import traceback
+import unicodedata
+
+try:
+    import fcntl
+except ImportError:
+    # fcntl doesn't exist on Windows. Backups just won't try to clone files there
+    fcntl = None
+
+import google.auth.exceptions
+import httplib2
 from google.auth.transport.requests import Request
+from google_auth_httplib2 import AuthorizedHttp
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
@@ -17,6 +43,13 @@ from googleapiclient.errors import HttpError
 REPO_PATH = "/path/to/customsprites"
 GOOGLE_CREDS_FILE_PATH = "/path/to/credentials.json"
 REMOVED_SPRITES_FOLDER = "/path/to/customsprites/Removed"
+# Where we keep things worth remembering between runs (like the author index). Anything in here can safely be deleted
+CACHE_FOLDER = "/path/to/cache"
+# Every removal writes down what it's about to do here first, so an interrupted run can pick up where it left off
+# with --resume. Don't delete this by hand while a removal is unfinished
+REMOVAL_JOURNAL_PATH = "/path/to/removal-journal.jsonl"
+# Jobs for the daemon (--daemon) are dropped in here by --submit, and their results end up next to them
+DAEMON_QUEUE_FOLDER = "/path/to/rm-sprites-queue"
 
 DEX_SPREADSHEET_ID = "spreadhseetIDHere"
 DEX_RESPONSE_SHEET_ID = "sheetIDHere"
@@ -30,40 +63,201 @@ CREDITS_SHEET_FUSION_NAME_COL = "C"
 
 NUM_SHEET_RETRIES = 5
 
-# If true, will re-fetch the spreadsheets after every request. Much slower, but is more safe in case the sheet is currently active
+# Sheets API quotas (per user, per minute). Requests are paced to stay under these instead of hitting 429s
+SHEETS_READ_REQUESTS_PER_MINUTE = 60
+SHEETS_WRITE_REQUESTS_PER_MINUTE = 60
+
+# How we check a cached sheet is still right without downloading it again: this many evenly spread samples of
+# this many rows each, plus this many rows around the end of the column
+REVALIDATE_SAMPLE_CHUNKS = 16
+REVALIDATE_SAMPLE_ROWS = 25
+REVALIDATE_TAIL_ROWS = 50
+
+# Biggest body we'll send in a single batchUpdate. The API rejects payloads much over 2MB, so anything bigger gets split up
+SHEET_BATCH_MAX_BYTES = 2_000_000
+
+# If true, the cached sheets are checked against the live ones right before anything is written and again at the end
+# of a run (a few probe reads, see above), and re-fetched where they've moved. Safer in case the sheet is currently active
 TRUST_NO_CACHE=True
 
+# The fusion name columns are saved to CACHE_FOLDER after every run. A saved copy younger than this is checked
+# against the sheet and patched where it differs instead of downloading the whole column again. 0 always downloads
+SHEET_SNAPSHOT_MAX_AGE_MINUTES = 60
+
+# Removals that touch at most this many sprites ask the sheets for just those rows (through a hidden lookup tab)
+# instead of downloading the whole fusion name columns, unless there are fresh snapshots to start from. 0 turns this off
+TARGETED_LOOKUP_MAX_FUSIONS = 50
+
+# How long to wait after printing the plan before anything gets changed, so the person running this can bail out
+START_DELAY_SECONDS = 5
+
+# How backups get the sprite files. "auto" clones or hard links them when the backup folder is on the same
+# filesystem as the repo (instant, and no extra disk space), and copies otherwise. "copy" always copies
+BACKUP_LINK_MODE = "auto"
+
+
 # ======= DO NOT MODIFY BELOW HERE =======
 
-def user_sprite_deletion(username: str, include_collabs: bool = False, only_delete: list = None, preserve_data: bool = False):
+CREDITS_CSV_COLUMNS = ["filename", "author", "status", "tags"]
+
+# Credited alongside a sprite when it references official art. They don't count as a collaborator
+NON_USER_COLLABORATORS = {"game freak", "pokemon tcg"}
+
+# 1.1, 1.1a, 1.1ab, 25, 25a. Base fusion and variant letters
+FUSION_NAME_REGEX = re.compile(r'([0-9]+(?:\.[0-9]+)?)([a-z]*)')
+
+# Header rows above the fusion names in each sheet
+DEX_RESPONSE_NUM_HEADERS = 2
+CREDITS_NUM_HEADERS = 1
+
+# How many seconds worth of quota can go out back to back before pacing kicks in
+SHEETS_BURST_SECONDS = 10
+# Retry backoff doubles from the base up to the max (jittered)
+SHEETS_BACKOFF_BASE_SECONDS = 1
+SHEETS_BACKOFF_MAX_SECONDS = 64
+RETRYABLE_SHEET_STATUSES = (408, 429, 500, 502, 503, 504)
+
+# Threads for sheet I/O. The dex and credits spreadsheets don't depend on each other so they're worked on side by side
+SHEET_IO_THREADS = 4
+
+# Where sprites live in the repo, relative to REPO_PATH
+SPRITE_DIRS = [os.path.join("Other", "BaseSprites"), "CustomBattlers"]
+
+# When a saved sheet snapshot is checked at start up, one probe goes to every this many rows of it
+SHEET_SNAPSHOT_CHUNK_ROWS = 1000
+
+# Targeted lookups write their formulas into a hidden tab with this name (plus the sheet it searches), made on first use
+SHEET_LOOKUP_TAB_NAME = "rm-sprites lookup"
+# and read this many rows from each match down, so the removal journal has something to check its writes against
+SHEET_LOOKUP_WINDOW_ROWS = 10
+
+# Longest run of neighbouring cells sent as one update block, which keeps any single block well under the payload limit
+SHEET_UPDATE_BLOCK_MAX_ROWS = 5000
+
+# How often the daemon looks for new jobs
+DAEMON_POLL_SECONDS = 0.5
+
+# Backups copy this many sprites at once
+BACKUP_THREADS = 8
+BACKUP_MANIFEST_NAME = "backup-manifest.json"
+# The backed up sprites' whole rows from both sheets, for restores
+BACKUP_SHEET_ROWS_NAME = "sheet-rows.json"
+# ioctl that asks the filesystem for a copy-on-write clone of a file (Linux)
+FICLONE = 0x40049409
+
+# Refresh the google token once it is this close to expiring, rather than on every call
+CREDS_REFRESH_MARGIN = datetime.timedelta(minutes=5)
+SHEETS_HTTP_TIMEOUT = 60
+
+def user_sprite_deletion(username: str, include_collabs: bool = False, only_delete: list = None, preserve_data: bool = False, dry_run: bool = False, plan_file: str = None):
     """
     Main loop that will iterate over a user's sprites and delete them from all needed resources
+    With dry_run set nothing is touched, and the plan and what it would cost is reported instead
     """
-    print(f"Removing sprites for user {username}...")
-    # Open and read in the credit sheet first
-    csv_file_path = os.path.join(REPO_PATH, 'Sprite Credits.csv')
-    df = pandas.read_csv(csv_file_path, names=["filename", "author", "status", "tags"])
-    
-    # Collab sprites must be seperated so they be handled approriately. We will differentiate sole authorship sprites from collab sprites.
-    all_user_rows = df[df["author"].str.contains(username, na=False)]
-    no_collab_rows = df.loc[df["author"] == username]
-    collab_rows = all_user_rows.drop(no_collab_rows.index)
-
-    # We already run into a weird edge case here where a sprite can be credited as a collab between Game Freak or Pokémon TCG
-    # if it is directly referencing official art. If that is the *only* collaborator we can safely remove that sprite.
-    cleaned_collabs = collab_rows["author"].str.replace('é', 'e').str.lower()
-    cleaned_username = username.lower().replace("é","e")
-    non_user_collab_strings = [f"{cleaned_username} & game freak", f"game freak & {cleaned_username}", f"{cleaned_username} & pokemon tcg", f"pokemon tcg & {cleaned_username}"]
-    non_user_collab_map = cleaned_collabs.str.contains('|'.join(non_user_collab_strings))
-
-    # We now patch together our results and have dataframes for collabs and non-collabs
-    non_user_collabs = collab_rows[non_user_collab_map]
-    true_collabs = collab_rows[~non_user_collab_map]
-    sole_author_rows = pandas.concat([no_collab_rows, non_user_collabs], axis=0)
-
-    # Pull out file names and remove the files
-    collab_files = true_collabs['filename'].tolist()
-    sole_author_files = sole_author_rows['filename'].tolist()
+    return batch_sprite_deletion([RemovalJob(username, include_collabs, only_delete, preserve_data)], dry_run, plan_file)
+
+
+def batch_sprite_deletion(jobs: list, dry_run: bool = False, plan_file: str = None, session: "RemovalSession" = None):
+    """
+    Removes the sprites for every job in one pass. The csv is read once, every user's sprites go into a single
+    combined removal plan, and that plan is applied against one fetch of each sheet
+    With dry_run set nothing is touched, and the plan and what it would cost is reported instead
+    Pass in a session to reuse what it already has loaded (the daemon does this), otherwise everything is loaded fresh
+    """
+    check_no_unfinished_removal(dry_run)
+
+    session = RemovalSession() if session is None else session
+    try:
+        # On a dry run the report is the only thing on stdout, so it can be piped straight into something else
+        with contextlib.redirect_stdout(sys.stderr) if dry_run else contextlib.nullcontext():
+            report = _run_batch_sprite_deletion(jobs, dry_run, session)
+    except BaseException:
+        # Whatever the session is holding might not match the csv or the sheets anymore
+        session.forget()
+        raise
+    if dry_run:
+        write_plan_report(report, plan_file)
+    return report
+
+
+def check_no_unfinished_removal(dry_run: bool = False):
+    """
+    Refuses to start while an earlier run's journal is waiting on --resume. This has to come before any backup, snapshot
+    or sheet work: against the half applied csv a rerun would find nothing to back up and overwrite the backup it made.
+    A dry run just gets a warning, since all it does is plan against that half applied state
+    """
+    if not os.path.exists(REMOVAL_JOURNAL_PATH):
+        return
+    if dry_run:
+        print(f"WARNING: A previous removal never finished (see {REMOVAL_JOURNAL_PATH}), this plan is against what it left half done", file=sys.stderr)
+        return
+    raise RuntimeError(f"A previous removal never finished (see {REMOVAL_JOURNAL_PATH}). Run with --resume to finish it first")
+
+
+def _run_batch_sprite_deletion(jobs: list, dry_run: bool, session: "RemovalSession"):
+    # Open and read in the credit sheet first. We hold onto it for the whole run and only write it back at the end
+    credits = session.load_credits()
+    author_index = session.get_author_index()
+
+    removal_list = []
+    job_sprites = []
+    for job in jobs:
+        print(f"Removing sprites for user {job.username}...")
+        user_files = find_user_sprites(credits, job.username, job.include_collabs, job.only_delete, author_index)
+        job_sprites.append(user_files)
+
+        print(f"-- Removing the following sprites for user {job.username}: --\n{user_files}\n-----------")
+        removal_list.extend(user_files)
+
+    # Two users can share a collab, make sure it only gets removed once
+    removal_list = list(dict.fromkeys(removal_list))
+    with get_profiler().phase("plan", rows=len(removal_list)):
+        plan = plan_removal(removal_list, session.get_fusion_groups())
+
+    if len(plan.renames) > 0:
+        print(f"-- The following sprites will be renamed to fill the gaps: --\n{plan.renames}\n-----------")
+
+    if dry_run:
+        # Where the real run would get the sheets from has to be worked out before we read them, since that leaves snapshots behind
+        sheet_sources = session.sheet_sources(plan.fusions())
+        # Reading the sheets is fine, we just need the row numbers. No targeted lookups though, those write to the sheets
+        sheet_changes = SheetChanges(plan, *session.sheet_indexes())
+        return removal_plan_report(jobs, job_sprites, plan, credits, sheet_changes, sheet_sources)
+
+    # Give the script runner some time to make sure there's no issues with the input before we start yeeting stuff
+    time.sleep(session.start_delay_seconds)
+
+    # Cache our spreadsheets
+    dex_response_sheet_cache, credit_sheet_cache = session.sheet_indexes(plan.fusions())
+
+    # Backups go after the sheets are cached, so they can take the sprites' sheet rows along with them
+    for job, user_files in zip(jobs, job_sprites):
+        if job.preserve_data:
+            print(f"Making backup for {job.username}...")
+            make_backup(user_files, job.username, credits, dex_response_sheet_cache, credit_sheet_cache)
+
+    # The journal writes the csv itself, and only once it has noted what it's writing. Flushing whatever is
+    # left in memory after a failure would get ahead of it
+    apply_removal_plan(plan, credits, dex_res_cache = dex_response_sheet_cache, credits_cache = credit_sheet_cache)
+    session.applied(plan)
+
+    _check_sheets_after_run(dex_response_sheet_cache, credit_sheet_cache)
+    print("Completed removals")        
+
+
+def find_user_sprites(credits: "CreditsStore", username: str, include_collabs: bool = False, only_delete: list = None, author_index: "AuthorIndex" = None) -> list:
+    """
+    Works out which sprites should be removed for a user
+    """
+    if author_index is None:
+        author_index = AuthorIndex.for_credits(credits)
+
+    # Collab sprites must be seperated so they be handled approriately. Sprites where the only other credit is
+    # Game Freak or Pokémon TCG (official art references) already count as sole author sprites in the index
+    sole_author_files, collab_files = author_index.sprites_for(username)
+    if len(sole_author_files) + len(collab_files) == 0:
+        close_matches = difflib.get_close_matches(normalize_author_name(username), author_index.authors.keys(), n=5)
+        print(f"WARNING: No sprites credited to {username}. Similar names in the credits: {close_matches}")
 
     if include_collabs or only_delete is not None:
         sole_author_files.extend(collab_files)
@@ -77,210 +271,1256 @@ def user_sprite_deletion(username: str, include_collabs: bool = False, only_dele
         if len(missing_fusions) > 0:
             print(f"WARNING: Supplied fusions not found by {username}:\n{missing_fusions}.\n")
 
-    if preserve_data:
-        print("Making backup...")
-        make_backup(sole_author_files, username)
+    return sole_author_files
 
-    print(f"-- Removing the following sprites for user {username}: --\n{sole_author_files}\n-----------")
-    # Give the script runner some time to make sure there's no issues with the input before we start yeeting stuff
-    time.sleep(5)
-
-    # Cache our spreadsheets
-    dex_response_sheet_cache = retry_sheet_operation(get_sprites_from_dex_response_sheet)
-    credit_sheet_cache = retry_sheet_operation(get_sprites_from_credit_sheet)
 
-    for fusion_id in sole_author_files:
-        # Determine which file are affected and need to be bumped up a number after the removal of this current file
-        regex = "^" + _fusion_name(fusion_id) + "[a-z]{0,2}"
-        matching_files = df[df["filename"].str.fullmatch(regex)]
-        matching_files_list = matching_files["filename"].tolist()
+class RemovalJob:
+    """
+    One user's removal request, the same things you can pass on the command line
+    """
+    def __init__(self, username: str, include_collabs: bool = False, only_delete: list = None, preserve_data: bool = False):
+        self.username = username
+        self.include_collabs = include_collabs
+        self.only_delete = only_delete
+        self.preserve_data = preserve_data
 
-        _smaller_fusions, larger_fusions = split_list_on_removed_file(fusion_id, matching_files_list)
 
-        # We delete first because it makes it easier to scootch the subsequent files back once it's already gone
-        print(f"- Removing fusion {fusion_id}...")
-        delete_fusion(fusion_id, dex_res_cache = dex_response_sheet_cache, credits_cache = credit_sheet_cache)
-        
-        # Bc im tired
-        if TRUST_NO_CACHE:
-            print("Refilling cache...")
-            dex_response_sheet_cache_new = retry_sheet_operation(get_sprites_from_dex_response_sheet)
-            credit_sheet_cache_new = retry_sheet_operation(get_sprites_from_credit_sheet)
-            
-            if dex_response_sheet_cache_new != dex_response_sheet_cache:
-                print(f"Something has happened at {datetime.datetime.now()} and the dex cache is now wrong! Fixing...")
-                dex_response_sheet_cache = dex_response_sheet_cache_new
-            
-            if credit_sheet_cache_new != credit_sheet_cache:
-                print(f"Something has happened at {datetime.datetime.now()} and the credit cache is now wrong!! Fixing...")
-                credit_sheet_cache = credit_sheet_cache_new
-
-
-        if len(larger_fusions) > 0:
-            print(f" * Fixing data for affected fusions: {larger_fusions}...")
-            debump_fusions(larger_fusions, dex_res_cache = dex_response_sheet_cache, credits_cache = credit_sheet_cache)
-            
-            # Bc im tired
-            if TRUST_NO_CACHE:
-                print("Refilling cache...")
-                dex_response_sheet_cache_new = retry_sheet_operation(get_sprites_from_dex_response_sheet)
-                credit_sheet_cache_new = retry_sheet_operation(get_sprites_from_credit_sheet)
-                
-                if dex_response_sheet_cache_new != dex_response_sheet_cache:
-                    print(f"Something has happened at {datetime.datetime.now()} and the dex cache is now wrong! Fixing...")
-                    dex_response_sheet_cache = dex_response_sheet_cache_new
-                
-                if credit_sheet_cache_new != credit_sheet_cache:
-                    print(f"Something has happened at {datetime.datetime.now()} and the credit cache is now wrong!! Fixing...")
-                    credit_sheet_cache = credit_sheet_cache_new
-
-            # I could do something smart here and update our cache, but it's pretty inexpensive to just re-read this file
-            df = pandas.read_csv(csv_file_path, names=["filename", "author", "status", "tags"])
-
-        # If a fusion by this author was modified just now, make sure we account for that
-        if bool(set(larger_fusions) & set(sole_author_files)):
-            for bumped_sprite in set(larger_fusions) & set(sole_author_files):
-                bumped_sprite_index = sole_author_files.index(bumped_sprite) 
-                sole_author_files[bumped_sprite_index] = bump_down_filename(bumped_sprite)
-                print(f"        Removal affected {username}'s {bumped_sprite}. Adjusting to {bump_down_filename(bumped_sprite)}")
-    
-    print("Completed removals")        
+class RemovalSession:
+    """
+    Everything a removal works from: the credits csv, the author index and both sheet caches. A normal run makes one
+    and throws it away. The daemon keeps one between jobs and only checks it's still current before each job,
+    instead of loading it all again
+    """
+    def __init__(self, start_delay_seconds: float = None):
+        self.start_delay_seconds = START_DELAY_SECONDS if start_delay_seconds is None else start_delay_seconds
+        self.credits = None
+        self.author_index = None
+        self.fusion_groups = None
+        self.fusion_groups_csv = None
+        self.dex_res_cache = None
+        self.credits_cache = None
+
+    def load_credits(self) -> "CreditsStore":
+        """
+        The credits store, read again if the csv was changed on disk by something else (a git pull, say)
+        """
+        if self.credits is None or self.credits.changed_on_disk():
+            self.credits = CreditsStore()
+        return self.credits
+
+    def get_author_index(self) -> "AuthorIndex":
+        credits = self.load_credits()
+        index = self.author_index
+        if index is None or credits.unsaved_edits > 0 or (index.csv_mtime_ns, index.csv_size) != (credits.file_stat.st_mtime_ns, credits.file_stat.st_size):
+            with get_profiler().phase("author_index"):
+                self.author_index = AuthorIndex.for_credits(credits)
+        return self.author_index
+
+    def get_fusion_groups(self) -> "FusionGroupIndex":
+        """
+        The fusion group index for the csv we're holding, only built again if the csv was changed by something else
+        """
+        credits = self.load_credits()
+        csv_key = (credits.file_stat.st_mtime_ns, credits.file_stat.st_size)
+        if self.fusion_groups is None or credits.unsaved_edits > 0 or self.fusion_groups_csv != csv_key:
+            with get_profiler().phase("fusion_groups"):
+                self.fusion_groups = FusionGroupIndex(credits.df["filename"])
+            self.fusion_groups_csv = csv_key
+        return self.fusion_groups
+
+    def sheet_indexes(self, fusions: list = None) -> tuple:
+        """
+        Both sheet caches. The first time they're fetched (or loaded from the saved snapshots), after that
+        they're checked against the sheets with the same probes a snapshot gets, and patched where they differ.
+        Given the fusions a removal is after, a small one gets targeted lookups instead (see get_sheet_indexes_for),
+        which aren't held onto since they don't know the rest of the sheet
+        """
+        if self.dex_res_cache is None or self.credits_cache is None:
+            dex_res_cache, credits_cache = get_sheet_indexes() if fusions is None else get_sheet_indexes_for(fusions)
+            if not (dex_res_cache.partial or credits_cache.partial):
+                self.dex_res_cache, self.credits_cache = dex_res_cache, credits_cache
+            return dex_res_cache, credits_cache
+
+        # From here on they're no better than a snapshot, only the samples get checked
+        self.dex_res_cache.from_snapshot = self.credits_cache.from_snapshot = True
+        pool = get_io_pool()
+        changed = _wait_all([
+            pool.submit(revalidate_dex_response_cache, self.dex_res_cache, (), _snapshot_probe_samples(self.dex_res_cache), False),
+            pool.submit(revalidate_credit_cache, self.credits_cache, (), _snapshot_probe_samples(self.credits_cache), False),
+        ])
+        if any(changed):
+            save_sheet_snapshots(self.dex_res_cache, self.credits_cache)
+        return self.dex_res_cache, self.credits_cache
+
+    def sheet_sources(self, fusions: list) -> dict:
+        """
+        Where sheet_indexes(fusions) would get each sheet from, without asking the sheets: "held" (what we already have,
+        probed), "lookup", "snapshot" (probed) or "fetch" (the whole column). Dry runs work out their costs from this
+        """
+        if self.dex_res_cache is not None and self.credits_cache is not None:
+            return {"dex": "held", "credits": "held"}
+        if _uses_targeted_lookup(fusions):
+            return {"dex": "lookup", "credits": "lookup"}
+        return {
+            "dex": "fetch" if SheetSnapshot.load("dex", DEX_SPREADSHEET_ID, _dex_response_sheet_range()) is None else "snapshot",
+            "credits": "fetch" if SheetSnapshot.load("credits", CREDITS_SPREADSHEET_ID, _credit_sheet_range()) is None else "snapshot",
+        }
 
-def delete_fusion(fusion:str, dex_res_cache:list = None, dex_appr_cache:list = None, credits_cache:list = None):
+    def warm_up(self):
+        self.get_author_index()
+        self.get_fusion_groups()
+        self.sheet_indexes()
+
+    def applied(self, plan: "RemovalPlan"):
+        """
+        A plan went through. The csv and sheet caches were updated along the way, this brings the author and fusion group
+        indexes up to date
+        """
+        if self.fusion_groups is not None and self.credits.unsaved_edits == 0:
+            self.fusion_groups = self.fusion_groups.after_plan(plan)
+            self.fusion_groups_csv = (self.credits.file_stat.st_mtime_ns, self.credits.file_stat.st_size)
+        if len(plan.restored) > 0:
+            # Restored rows can credit anyone, next time it's needed the index just gets built from the csv again
+            self.author_index = None
+        elif self.author_index is not None and self.credits.unsaved_edits == 0:
+            self.author_index = self.author_index.after_removal(plan, self.credits.file_stat)
+            self.author_index.save()
+
+    def forget(self):
+        self.credits = None
+        self.author_index = None
+        self.fusion_groups = None
+        self.dex_res_cache = None
+        self.credits_cache = None
+
+
+def read_batch_file(batch_file_path: str) -> list:
+    """
+    Reads a file of removal jobs. Each line looks like the command line for a single user (username [-c] [-o ...] [-b]),
+    blank lines and lines starting with # are skipped
+    """
+    job_parser = _make_job_parser()
+    jobs = []
+    with open(batch_file_path, encoding="utf-8") as batch_file:
+        for line_num, line in enumerate(batch_file, start=1):
+            if line.strip() == "" or line.strip().startswith("#"):
+                continue
+            job_args = job_parser.parse_args(shlex.split(line))
+            if job_args.username is None:
+                raise ValueError(f"No username on line {line_num} of {batch_file_path}")
+            jobs.append(RemovalJob(job_args.username, job_args.collabs, job_args.only, job_args.backup))
+    return jobs
+
+
+def delete_fusion(fusion:str, dex_res_cache: "SheetRowIndex" = None, dex_appr_cache:list = None, credits_cache: "SheetRowIndex" = None, credits: "CreditsStore" = None):
     """
     Handles deleting the given fusion from all required resources (the file, credits spreadsheet, dex entry spreadsheet, ect)
+    If a credits store is passed in, its other unsaved edits get written out along with this one
     """
-    # Delete the fusion from any google sheets resources
-    #  Dex response sheet
-    dex_result_rows_to_delete = find_sprite_in_dex_response_sheet(fusion, dex_res_cache)
-    if len(dex_result_rows_to_delete) < 1:
-        pass
-    else:
-        retry_sheet_operation(run_sheet_delete, DEX_SPREADSHEET_ID, DEX_RESPONSE_SHEET_ID, dex_result_rows_to_delete)
-        # Update cache
-        if dex_res_cache is not None:
-            for row in dex_result_rows_to_delete:
-                del dex_res_cache[row - 3]
-
-    #  Credits sheet
-    credits_rows_to_delete = find_sprite_in_credit_sheet(fusion , cache=credits_cache)
-    if len(credits_rows_to_delete) < 1:
-        print(f"WARNING: No rows in credit sheet found for fusion {fusion}. THIS SHOULD NOT HAPPEN.")
+    plan = RemovalPlan(removed=[fusion])
+    _apply_with_credits(plan, credits, dex_res_cache, credits_cache)
+
+def debump_fusions(fusion_list:str, dex_res_cache: "SheetRowIndex" = None, dex_appr_cache:list = None, credits_cache: "SheetRowIndex" = None, credits: "CreditsStore" = None):
+    """
+    Takes the fusion and decrements its filename by one everywhere
+    If a credits store is passed in, its other unsaved edits get written out along with these
+    """
+    plan = RemovalPlan(renames={fusion: bump_down_filename(fusion) for fusion in fusion_list})
+    _apply_with_credits(plan, credits, dex_res_cache, credits_cache)
+
+def apply_removal_plan(plan: "RemovalPlan", credits: "CreditsStore", dex_res_cache: "SheetRowIndex" = None, credits_cache: "SheetRowIndex" = None):
+    """
+    Applies a removal plan everywhere: one set of sheet writes per spreadsheet, then the file deletes and renames,
+    then the csv edits. Every step goes through a RemovalJournal, and the caches are patched to match what was written.
+    Restore plans come through here too, their sprites are put back along the way
+    """
+    # To save us a lot of extra requests, we'll preform a single get for the sheet data we need and cache it
+    if dex_res_cache is None and credits_cache is None:
+        dex_res_cache, credits_cache = get_sheet_indexes_for(plan.fusions())
+    elif dex_res_cache is None:
+        dex_res_cache = get_dex_response_sheet_index()
+    elif credits_cache is None:
+        credits_cache = get_credit_sheet_index()
+
+    # Work out every row we need to touch while the cached row numbers still match the sheets
+    sheet_changes = SheetChanges(plan, dex_res_cache, credits_cache)
+
+    # Bc im tired. Make sure every row we're about to touch still holds what we think it does before writing anything.
+    # A snapshot only had its samples probed when it was loaded, so its rows get this even if we trust the cache.
+    # Lookups were only just made, and don't know enough of the sheet to be probed
+    from_snapshot = dex_res_cache.from_snapshot or credits_cache.from_snapshot
+    if (TRUST_NO_CACHE or from_snapshot) and not (dex_res_cache.partial or credits_cache.partial):
+        dex_changed, credits_changed = revalidate_sheet_indexes(dex_res_cache, credits_cache,
+            sheet_changes.dex_rows_to_delete + list(sheet_changes.dex_updates.keys()),
+            sheet_changes.credits_rows_to_delete + list(sheet_changes.credits_updates.keys()),
+            num_samples=None if TRUST_NO_CACHE else 0)
+        if dex_changed or credits_changed:
+            sheet_changes = SheetChanges(plan, dex_res_cache, credits_cache)
+
+    # Check every delete, rename and restore against the sprite folders before anything at all gets changed
+    problems = SpriteFileChanges(plan.removed, plan.renames, restored={fusion: entry["source"] for fusion, entry in plan.restored.items()}).check(SpriteDirSnapshot())
+    if len(problems) > 0:
+        raise RuntimeError("Can't apply the plan to the sprite folders:\n" + "\n".join(problems))
+
+    # The saved sheets won't match once we start writing, and if we don't make it to the end nobody can say what they'd need
+    discard_sheet_snapshots()
+
+    # Write down everything we're about to do before doing any of it, so a crash anywhere below can be resumed
+    journal = RemovalJournal.start(plan, credits, sheet_changes, dex_res_cache, credits_cache)
+    run_removal_journal(journal, credits)
+
+    # Update caches
+    _patch_cache(dex_res_cache, sheet_changes.dex_updates, sheet_changes.dex_rows_to_delete, sheet_changes.dex_inserted_names)
+    _patch_cache(credits_cache, sheet_changes.credits_updates, sheet_changes.credits_rows_to_delete, sheet_changes.credits_inserted_names)
+    save_sheet_snapshots(dex_res_cache, credits_cache)
+
+    if len(plan.removed) > 0:
+        print(f"Removed: {len(sheet_changes.dex_rows_to_delete)} rows in dex responses; {len(sheet_changes.credits_rows_to_delete)} rows in credits")
+    if len(plan.renames) > 0:
+        print(f"Renamed: {len(sheet_changes.dex_updates)} rows in dex responses; {len(sheet_changes.credits_updates)} rows in credits")
+    if len(plan.restored) > 0:
+        print(f"Restored: {len(sheet_changes.dex_inserts)} rows in dex responses; {len(sheet_changes.credits_inserts)} rows in credits")
+
+
+def make_backup(fusions:list, username:str, credits: "CreditsStore" = None, dex_res_cache: "SheetRowIndex" = None, credits_cache: "SheetRowIndex" = None):
+    """
+    Saves the given sprites and their credit rows to REMOVED_SPRITES_FOLDER/<username>. Files are copied on a thread
+    pool, and where the backup folder is on the same filesystem as the repo they're cloned or hard linked instead of
+    copied (see BACKUP_LINK_MODE). A manifest with every file's checksum is written alongside, for verify_backup.
+    Given the sheet caches, the sprites' whole rows in both sheets are saved too, so restore_backups can put them back
+    """
+    backup_user_dir = os.path.join(REMOVED_SPRITES_FOLDER, username)
+    os.makedirs(os.path.join(backup_user_dir, "Other", "BaseSprites"), exist_ok=True)
+    os.makedirs(os.path.join(backup_user_dir, "CustomBattlers"), exist_ok=True)
+
+    # Links are only possible within one filesystem, so there's no point trying them otherwise
+    link_mode = BACKUP_LINK_MODE
+    if link_mode != "copy" and os.stat(REPO_PATH).st_dev != os.stat(backup_user_dir).st_dev:
+        link_mode = "copy"
+
+    fusions = list(dict.fromkeys(fusions))
+    with concurrent.futures.ThreadPoolExecutor(max_workers=BACKUP_THREADS) as pool:
+        backed_up = _wait_all([pool.submit(_backup_sprite, fusion, backup_user_dir, link_mode) for fusion in fusions])
+
+    # Pull out the credit lines for every backed up sprite in one go
+    df = credits.df if credits is not None else CreditsStore().df
+    new_csv_file_path = os.path.join(backup_user_dir, 'Sprite Credits.csv')
+    with get_profiler().phase("backup.csv") as stats:
+        new_df = df[df["filename"].isin(fusions)]
+        csv_data = new_df.to_csv(index=False, header=False).encode("utf-8")
+        _write_file_atomically(new_csv_file_path, csv_data)
+        stats["rows"], stats["bytes"] = len(new_df), len(csv_data)
+
+    manifest = {
+        "username": username,
+        "created_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "csv": {"path": "Sprite Credits.csv", "sha256": hashlib.sha256(csv_data).hexdigest(), "rows": len(new_df)},
+        "files": {entry["path"]: entry for entry in backed_up},
+    }
+    if dex_res_cache is not None and credits_cache is not None:
+        with get_profiler().phase("backup.sheets") as stats:
+            sheet_rows = _backup_sheet_rows(fusions, dex_res_cache, credits_cache)
+            sheet_rows_data = json.dumps(sheet_rows).encode("utf-8")
+            _write_file_atomically(os.path.join(backup_user_dir, BACKUP_SHEET_ROWS_NAME), sheet_rows_data)
+            stats["rows"] = sum(len(rows) for sheet in sheet_rows.values() for rows in sheet.values())
+            stats["bytes"] = len(sheet_rows_data)
+        manifest["sheet_rows"] = {"path": BACKUP_SHEET_ROWS_NAME, "sha256": hashlib.sha256(sheet_rows_data).hexdigest()}
+    _write_file_atomically(os.path.join(backup_user_dir, BACKUP_MANIFEST_NAME), json.dumps(manifest, indent=2).encode("utf-8"))
+
+    methods = collections.Counter(entry["method"] for entry in backed_up)
+    print(f"Backed up {len(backed_up)} sprites to {backup_user_dir} ({', '.join(f'{count} {method}' for method, count in methods.items())})")
+
+
+def verify_backup(username: str) -> list:
+    """
+    Checks a backup against its manifest. Files whose size and modification time still match what the manifest
+    recorded are trusted without being read, only the ones that look different get hashed again.
+    Returns a list of problems, empty if the backup is fine
+    """
+    backup_user_dir = os.path.join(REMOVED_SPRITES_FOLDER, username)
+    with open(os.path.join(backup_user_dir, BACKUP_MANIFEST_NAME), encoding="utf-8") as manifest_file:
+        manifest = json.load(manifest_file)
+
+    problems = []
+    # Backups made before sheet rows were saved don't have them
+    sheet_rows = [(manifest["sheet_rows"]["path"], manifest["sheet_rows"])] if "sheet_rows" in manifest else []
+    for relative_path, entry in list(manifest["files"].items()) + [(manifest["csv"]["path"], manifest["csv"])] + sheet_rows:
+        backup_file = os.path.join(backup_user_dir, relative_path)
+        if not os.path.exists(backup_file):
+            problems.append(f"{relative_path} is missing")
+            continue
+        file_stat = os.stat(backup_file)
+        if file_stat.st_size == entry.get("size", file_stat.st_size) and file_stat.st_mtime_ns == entry.get("mtime_ns"):
+            continue
+        if _file_sha256(backup_file) != entry["sha256"]:
+            problems.append(f"{relative_path} doesn't match its checksum")
+
+    return problems
+
+
+def load_backup(username: str) -> list:
+    """
+    Reads a user's backup back in, after checking it against its manifest. Returns one entry per backed up sprite:
+    its old name, its file, and its csv rows and sheet rows (no sheet rows if the backup didn't save any)
+    """
+    problems = verify_backup(username)
+    if len(problems) > 0:
+        raise RuntimeError(f"The backup for {username} doesn't match its manifest, not restoring from it:\n" + "\n".join(problems))
+
+    backup_user_dir = os.path.join(REMOVED_SPRITES_FOLDER, username)
+    with open(os.path.join(backup_user_dir, BACKUP_MANIFEST_NAME), encoding="utf-8") as manifest_file:
+        manifest = json.load(manifest_file)
+
+    csv_rows = {}
+    if manifest["csv"]["rows"] > 0:
+        # Read the same way as the live csv, but with blanks as None so the rows can go through the journal as JSON
+        df = pandas.read_csv(os.path.join(backup_user_dir, manifest["csv"]["path"]), names=CREDITS_CSV_COLUMNS, dtype={"filename": str})
+        for row in df.astype(object).where(df.notna(), None).values.tolist():
+            csv_rows.setdefault(row[0], []).append(row)
+
+    sheet_rows = {"dex_responses": {}, "credits": {}}
+    if "sheet_rows" in manifest:
+        with open(os.path.join(backup_user_dir, manifest["sheet_rows"]["path"]), encoding="utf-8") as sheet_rows_file:
+            sheet_rows = json.load(sheet_rows_file)
     else:
-        retry_sheet_operation(run_sheet_delete, CREDITS_SPREADSHEET_ID, CREDITS_CREDIT_SHEET_ID, credits_rows_to_delete)
-        # Update cache
-        if credits_cache is not None:
-            for row in credits_rows_to_delete:
-                del credits_cache[row - 2]
+        print(f"WARNING: The backup for {username} was made before sheet rows were saved with backups. Its sprites can go back "
+              f"in the repo and the csv, but will have to be added back to the sheets by hand")
 
-    print(f"Removed: {dex_result_rows_to_delete} in dex responses; {credits_rows_to_delete} in credits")
+    return [{
+        "username": username,
+        "fusion": entry["fusion"],
+        "source": os.path.join(backup_user_dir, relative_path),
+        "sha256": entry["sha256"],
+        "csv_rows": csv_rows.get(entry["fusion"], []),
+        "dex_rows": sheet_rows["dex_responses"].get(entry["fusion"], []),
+        "credits_rows": sheet_rows["credits"].get(entry["fusion"], []),
+    } for relative_path, entry in manifest["files"].items()]
 
-    # Delete the file from the repo
-    sprite_dir = os.path.join("Other", "BaseSprites") if not '.' in fusion else "CustomBattlers"
-    fusion_file = os.path.join(REPO_PATH, sprite_dir, f"{fusion}.png")
-    os.remove(fusion_file)
 
-    # Remove the credit line in the repo's csv
-    csv_file_path = os.path.join(REPO_PATH, 'Sprite Credits.csv')
-    df = pandas.read_csv(csv_file_path, names=["filename", "author", "status", "tags"])
-    df.drop(df.loc[df['filename'] == fusion].index, inplace=True)
-    df.to_csv(csv_file_path, index=False, header=False)
+def restore_backups(usernames: list, dry_run: bool = False, plan_file: str = None, session: "RemovalSession" = None):
+    """
+    Puts users' backups (from make_backup) back in one pass. plan_restore works out where every sprite goes and
+    which sprites shift up to make room, and that plan is applied just like a removal: one set of file moves, one csv
+    rewrite, and one batch of sheet inserts and updates per spreadsheet, journaled so --resume can finish it.
+    Sprites that are already back in their group (same file) are skipped, so restoring twice does nothing the second time
+    With dry_run set nothing is touched, and the plan is reported instead
+    """
+    check_no_unfinished_removal(dry_run)
+
+    session = RemovalSession() if session is None else session
+    try:
+        # Same as a removal, only the report goes to stdout on a dry run
+        with contextlib.redirect_stdout(sys.stderr) if dry_run else contextlib.nullcontext():
+            report = _run_restore_backups(usernames, dry_run, session)
+    except BaseException:
+        session.forget()
+        raise
+    if dry_run and report is not None:
+        write_plan_report(report, plan_file)
+    return report
+
+
+def _run_restore_backups(usernames: list, dry_run: bool, session: "RemovalSession"):
+    credits = session.load_credits()
+    fusion_groups = session.get_fusion_groups()
+
+    backed_up = []
+    for username in usernames:
+        print(f"Reading backup for {username}...")
+        backed_up.extend(load_backup(username))
+
+    # Only the groups being restored into get hashed, which is a handful of files
+    group_hashes = {}
+    to_restore = []
+    for sprite in backed_up:
+        fusion_name = _fusion_name(sprite["fusion"])
+        if fusion_name not in group_hashes:
+            sprite_paths = [_sprite_path(sprite_name) for _, sprite_name in fusion_groups.variants(fusion_name)]
+            group_hashes[fusion_name] = {_file_sha256(sprite_path) for sprite_path in sprite_paths if os.path.exists(sprite_path)}
+        if sprite["sha256"] in group_hashes[fusion_name]:
+            print(f"{sprite['fusion']} from {sprite['username']}'s backup is already in the repo, skipping it")
+        else:
+            to_restore.append(sprite)
 
-def debump_fusions(fusion_list:str, dex_res_cache:list = None, dex_appr_cache:list = None, credits_cache:list = None):
+    with get_profiler().phase("plan", rows=len(to_restore)):
+        plan = plan_restore(to_restore, fusion_groups)
+
+    restoring = {entry["source"]: fusion for fusion, entry in plan.restored.items()}
+    print(f"-- Restoring the following sprites: --\n{restoring}\n-----------")
+    if len(plan.renames) > 0:
+        print(f"-- The following sprites will be renamed to make room: --\n{plan.renames}\n-----------")
+    missing_sheet_rows = [fusion for fusion, entry in plan.restored.items() if len(entry["credits_rows"]) == 0]
+    if len(missing_sheet_rows) > 0:
+        print(f"WARNING: No credits sheet rows in the backup for these, they'll need adding to the sheets by hand:\n{missing_sheet_rows}")
+
+    if len(plan.restored) == 0:
+        print("Nothing to restore")
+        return None
+
+    if dry_run:
+        # Plain reads only, same as a removal dry run
+        sheet_sources = session.sheet_sources(plan.fusions())
+        sheet_changes = SheetChanges(plan, *session.sheet_indexes())
+        return restore_plan_report(usernames, plan, credits, sheet_changes, sheet_sources)
+
+    # Same as a removal, a moment to bail out before anything changes
+    time.sleep(session.start_delay_seconds)
+
+    dex_response_sheet_cache, credit_sheet_cache = session.sheet_indexes(plan.fusions())
+    apply_removal_plan(plan, credits, dex_res_cache = dex_response_sheet_cache, credits_cache = credit_sheet_cache)
+    session.applied(plan)
+
+    _check_sheets_after_run(dex_response_sheet_cache, credit_sheet_cache)
+    print("Completed restore")
+
+
+# === Removal planning ===
+
+class RemovalPlan:
     """
-    Takes the fusion and decrements its filename by one everywhere
+    The final state of every fusion group a removal touches: the sprites that go away, and what each
+    surviving sprite that has to shift down ends up being called. Renames go straight from the
+    original name to the final one, in ascending order within each group.
+    A restore (see plan_restore) is the same thing the other way round: nothing is removed, sprites come back
+    from a backup (restored maps each one's new name to where its file, csv rows and sheet rows come from),
+    and the renames shift the sprites already there up to make room
     """
+    def __init__(self, removed: list = None, renames: dict = None, restored: dict = None):
+        self.removed = removed if removed is not None else []
+        self.renames = renames if renames is not None else {}
+        self.restored = restored if restored is not None else {}
 
-    # To save us a lot of extra requests, we'll preform a single get for the sheet data we need and cache it
-    if dex_res_cache is None:
-        dex_res_cache = get_sprites_from_dex_response_sheet()
-    if credits_cache is None:
-        credits_cache = get_sprites_from_credit_sheet()
+    def fusions(self) -> list:
+        """
+        Every sprite the plan touches, which is every sheet row it needs to find
+        """
+        return list(dict.fromkeys(self.removed + list(self.renames.keys())))
+
+
+def plan_removal(fusions: list, fusion_groups: "FusionGroupIndex") -> RemovalPlan:
+    """
+    Works out the removal of every given fusion in one pass. Each surviving variant in an affected group
+    moves down by the number of removed variants below it, so 1.1a, 1.1c and 1.1e going away turns
+    1.1f into 1.1c directly instead of bumping it down three separate times
+    """
+    removed = set(fusions)
+
+    plan = RemovalPlan(removed=list(dict.fromkeys(fusions)))
+    for fusion_name in dict.fromkeys(_fusion_name(fusion) for fusion in plan.removed):
+        num_removed_below = 0
+        last_num = -1
+        for version_num, sprite in fusion_groups.variants(fusion_name):
+            if sprite in removed:
+                num_removed_below += 1
+                continue
+            # Never below (or onto) the sprite kept before it, whatever the variant numbers look like
+            new_num = max(version_num - num_removed_below, last_num + 1)
+            if new_num != version_num:
+                plan.renames[sprite] = fusion_name + numeric_to_letters(new_num)
+            last_num = new_num
+
+    return plan
+
+
+def plan_restore(backed_up: list, fusion_groups: "FusionGroupIndex") -> RemovalPlan:
+    """
+    The reverse of plan_removal, for sprites coming back from backups (see load_backup). Each one goes back to the
+    variant it was, and every sprite in its group from there up shifts up to make room, so 1.1a and 1.1c coming back
+    turns today's 1.1a into 1.1b and 1.1b into 1.1d directly. If the group lost other variants in the meantime,
+    or two backups want the same variant, everything just closes up in order so there are no gaps
+    """
+    plan = RemovalPlan()
+    by_fusion_name = {}
+    for sprite in backed_up:
+        by_fusion_name.setdefault(_fusion_name(sprite["fusion"]), []).append(sprite)
+
+    for fusion_name, sprites in by_fusion_name.items():
+        wanted = sorted((parse_fusion_name(sprite["fusion"])[1], num, sprite) for num, sprite in enumerate(sprites))
+        wanted_nums = {version_num for version_num, _, _ in wanted}
+
+        # Whatever is there now keeps its order, and fills the variant numbers nobody is coming back to
+        slots = []
+        free_num = 0
+        for _, sprite_name in fusion_groups.variants(fusion_name):
+            while free_num in wanted_nums:
+                free_num += 1
+            slots.append((free_num, -1, sprite_name))
+            free_num += 1
+        slots += wanted
+
+        for version_num, (_, _, sprite) in enumerate(sorted(slots, key=lambda slot: slot[:2])):
+            new_fusion_name = fusion_name + numeric_to_letters(version_num)
+            if isinstance(sprite, dict):
+                plan.restored[new_fusion_name] = {
+                    "source": sprite["source"],
+                    "csv_rows": [[new_fusion_name] + row[1:] for row in sprite["csv_rows"]],
+                    "dex_rows": [_with_cell(row, DEX_SHEET_FUSION_NAME_COL, f"{new_fusion_name}.png") for row in sprite["dex_rows"]],
+                    "credits_rows": [_with_cell(row, CREDITS_SHEET_FUSION_NAME_COL, new_fusion_name) for row in sprite["credits_rows"]],
+                }
+            elif new_fusion_name != sprite:
+                plan.renames[sprite] = new_fusion_name
+
+    return plan
+
+
+class SheetChanges:
+    """
+    Every sheet row a plan touches, looked up against the cached sheets: rows to delete and {row: new name} updates
+    for each sheet. Row numbers are the ones the sheets had at lookup time
+    """
+    def __init__(self, plan: RemovalPlan, dex_res_cache: "SheetRowIndex", credits_cache: "SheetRowIndex"):
+        self.dex_cache = dex_res_cache
+        self.credits_cache = credits_cache
+        self.dex_rows_to_delete = []
+        self.credits_rows_to_delete = []
+        for fusion in plan.removed:
+            self.dex_rows_to_delete.extend(find_sprite_in_dex_response_sheet(fusion, dex_res_cache))
+            credits_rows = find_sprite_in_credit_sheet(fusion, credits_cache)
+            if len(credits_rows) < 1:
+                print(f"WARNING: No rows in credit sheet found for fusion {fusion}. THIS SHOULD NOT HAPPEN.")
+            self.credits_rows_to_delete.extend(credits_rows)
+
+        self.dex_updates = {}
+        self.credits_updates = {}
+        for fusion, new_fusion_name in plan.renames.items():
+            for row in find_sprite_in_dex_response_sheet(fusion, dex_res_cache):
+                self.dex_updates[row] = new_fusion_name
+            credits_rows = find_sprite_in_credit_sheet(fusion, credits_cache)
+            if len(credits_rows) < 1:
+                print(f"WARNING: No rows in credit sheet found for fusion {fusion}. THIS SHOULD NOT HAPPEN.")
+            for row in credits_rows:
+                self.credits_updates[row] = new_fusion_name
+
+        # Restored sprites get their rows back right under the last one in each sheet
+        self.dex_insert_row = dex_res_cache.num_headers + len(dex_res_cache) + 1
+        self.credits_insert_row = credits_cache.num_headers + len(credits_cache) + 1
+        self.dex_inserts = [row for entry in plan.restored.values() for row in entry["dex_rows"]]
+        self.credits_inserts = [row for entry in plan.restored.values() for row in entry["credits_rows"]]
+        self.dex_inserted_names = [fusion for fusion, entry in plan.restored.items() for _ in entry["dex_rows"]]
+        self.credits_inserted_names = [fusion for fusion, entry in plan.restored.items() for _ in entry["credits_rows"]]
+
+    def batcher(self) -> "SheetBatcher":
+        """
+        Puts every change into a batcher, ready to send
+        """
+        batcher = SheetBatcher()
+        dex_batch = batcher.batch(DEX_SPREADSHEET_ID)
+        dex_batch.update_cells(DEX_RESPONSE_SHEET_ID, DEX_SHEET_FUSION_NAME_COL, {row: f"{name}.png" for row, name in self.dex_updates.items()})
+        dex_batch.insert_rows(DEX_RESPONSE_SHEET_ID, self.dex_insert_row, self.dex_inserts)
+        dex_batch.delete_rows(DEX_RESPONSE_SHEET_ID, self.dex_rows_to_delete)
+        credits_batch = batcher.batch(CREDITS_SPREADSHEET_ID)
+        credits_batch.update_cells(CREDITS_CREDIT_SHEET_ID, CREDITS_SHEET_FUSION_NAME_COL, self.credits_updates)
+        credits_batch.insert_rows(CREDITS_CREDIT_SHEET_ID, self.credits_insert_row, self.credits_inserts)
+        credits_batch.delete_rows(CREDITS_CREDIT_SHEET_ID, self.credits_rows_to_delete)
+        return batcher
+
+
+def removal_plan_report(jobs: list, job_sprites: list, plan: RemovalPlan, credits: "CreditsStore", sheet_changes: SheetChanges, sheet_sources: dict) -> dict:
+    """
+    Machine readable version of a plan for dry runs: every change it would make, plus what that costs in
+    Sheets requests, cells, file moves and backup copies. sheet_sources is where the real run would get
+    the sheets from (see RemovalSession.sheet_sources)
+    """
+    backup_files = [fusion for job, sprites in zip(jobs, job_sprites) if job.preserve_data for fusion in sprites]
+    backup_bytes = sum(os.path.getsize(_sprite_path(fusion)) for fusion in backup_files if os.path.exists(_sprite_path(fusion)))
+
+    read_requests, write_requests = sheet_request_estimate(plan, sheet_changes, sheet_sources, backup=len(backup_files) > 0)
+    rows_deleted = len(set(sheet_changes.dex_rows_to_delete)) + len(set(sheet_changes.credits_rows_to_delete))
+    cells_updated = len(sheet_changes.dex_updates) + len(sheet_changes.credits_updates)
+
+    return {
+        "jobs": [{"username": job.username, "sprites": sprites, "backup": job.preserve_data} for job, sprites in zip(jobs, job_sprites)],
+        "plan": {"removed": plan.removed, "renames": plan.renames},
+        "files": {
+            "deleted": [_sprite_path(fusion) for fusion in plan.removed],
+            "moved": {_sprite_path(fusion): _sprite_path(new_fusion_name) for fusion, new_fusion_name in plan.renames.items()},
+        },
+        "csv": {
+            "rows_deleted": int(credits.df["filename"].isin(plan.removed).sum()),
+            "rows_renamed": int(credits.df["filename"].isin(plan.renames.keys()).sum()),
+        },
+        "sheets": {
+            "dex_responses": {"rows_deleted": sorted(set(sheet_changes.dex_rows_to_delete)), "cells_updated": sheet_changes.dex_updates},
+            "credits": {"rows_deleted": sorted(set(sheet_changes.credits_rows_to_delete)), "cells_updated": sheet_changes.credits_updates},
+        },
+        "cost": {
+            "sheet_read_requests": read_requests,
+            "sheet_write_requests": sum(write_requests.values()),
+            "sheet_write_requests_by_spreadsheet": write_requests,
+            "sheet_rows_deleted": rows_deleted,
+            "sheet_cells_updated": cells_updated,
+            # A deleted row takes every cell in it along with it, so count it as one change per row
+            "sheet_cells_changed": rows_deleted + cells_updated,
+            "files_deleted": len(plan.removed),
+            "files_moved": len(plan.renames),
+            "csv_rewrites": 1 if len(plan.removed) + len(plan.renames) > 0 else 0,
+            "backup_files_copied": len(backup_files),
+            "backup_bytes_copied": backup_bytes,
+        },
+    }
+
+
+def restore_plan_report(usernames: list, plan: RemovalPlan, credits: "CreditsStore", sheet_changes: SheetChanges, sheet_sources: dict) -> dict:
+    """
+    removal_plan_report for a restore: every sprite coming back and where it goes, what shifts up to make room,
+    and what that costs
+    """
+    read_requests, write_requests = sheet_request_estimate(plan, sheet_changes, sheet_sources)
+    rows_inserted = len(sheet_changes.dex_inserts) + len(sheet_changes.credits_inserts)
+    cells_updated = len(sheet_changes.dex_updates) + len(sheet_changes.credits_updates)
+
+    return {
+        "usernames": usernames,
+        "plan": {"restored": {fusion: entry["source"] for fusion, entry in plan.restored.items()}, "renames": plan.renames},
+        "files": {
+            "restored": {entry["source"]: _sprite_path(fusion) for fusion, entry in plan.restored.items()},
+            "moved": {_sprite_path(fusion): _sprite_path(new_fusion_name) for fusion, new_fusion_name in plan.renames.items()},
+        },
+        "csv": {
+            "rows_added": sum(len(entry["csv_rows"]) for entry in plan.restored.values()),
+            "rows_renamed": int(credits.df["filename"].isin(plan.renames.keys()).sum()),
+        },
+        "sheets": {
+            "dex_responses": {"rows_inserted_at": sheet_changes.dex_insert_row, "rows_inserted": len(sheet_changes.dex_inserts), "cells_updated": sheet_changes.dex_updates},
+            "credits": {"rows_inserted_at": sheet_changes.credits_insert_row, "rows_inserted": len(sheet_changes.credits_inserts), "cells_updated": sheet_changes.credits_updates},
+        },
+        "cost": {
+            "sheet_read_requests": read_requests,
+            "sheet_write_requests": sum(write_requests.values()),
+            "sheet_write_requests_by_spreadsheet": write_requests,
+            "sheet_rows_inserted": rows_inserted,
+            "sheet_cells_updated": cells_updated,
+            "files_copied": len(plan.restored),
+            "files_moved": len(plan.renames),
+            "csv_rewrites": 1,
+        },
+    }
+
+
+def sheet_request_estimate(plan: RemovalPlan, sheet_changes: SheetChanges, sheet_sources: dict, backup: bool = False) -> tuple:
+    """
+    The Sheets requests applying a plan takes: (reads, {spreadsheet id: writes}). Follows the path the real run
+    would take from where it gets the sheets (sheet_sources, see RemovalSession.sheet_sources) through the journal's
+    batchUpdates to the check at the end. Retries, and refetches after a probe finds something moved, can't be
+    known in advance so they aren't counted
+    """
+    write_requests = {spreadsheet_id: len(batch.chunks()) for spreadsheet_id, batch in sheet_changes.batcher().batches.items()}
+    read_requests = 0
+    sheets = [("dex", DEX_SPREADSHEET_ID, DEX_RESPONSE_SHEET_NAME, find_sprite_in_dex_response_sheet, sheet_changes.dex_cache),
+              ("credits", CREDITS_SPREADSHEET_ID, CREDITS_CREDIT_SHEET_NAME, find_sprite_in_credit_sheet, sheet_changes.credits_cache)]
+    for name, spreadsheet_id, sheet_name, find, cache in sheets:
+        if sheet_sources[name] == "lookup":
+            # The formula write and the clear (the first lookup on a spreadsheet also has a failed write and an addSheet),
+            # then one read of the rows around the matches if there are any
+            write_requests[spreadsheet_id] = write_requests.get(spreadsheet_id, 0) + (2 if _lookup_tab_exists(spreadsheet_id, sheet_name) else 4)
+            read_requests += 1 if any(len(find(fusion, cache)) > 0 for fusion in plan.fusions()) else 0
+        else:
+            # One request of probes for a held cache or a snapshot, or the whole column
+            read_requests += 1
 
-    # Also in an effort to save some requests, we'll collect the updates and run them in bulk at the end
-    dex_response_update_data = []
-    credits_update_data = []
+    if "lookup" not in sheet_sources.values():
+        # apply_removal_plan probes the rows it's about to touch, then _check_sheets_after_run has one last look
+        from_snapshot = any(source in ("held", "snapshot") for source in sheet_sources.values())
+        read_requests += (2 if TRUST_NO_CACHE or from_snapshot else 0) + (2 if TRUST_NO_CACHE else 0)
+    if backup:
+        # The backed up sprites' whole rows, one read per sheet
+        read_requests += 2
+    return read_requests, write_requests
 
 
-    for fusion in fusion_list:
-        new_fusion_name = bump_down_filename(fusion)
+def write_plan_report(report: dict, plan_file: str = None):
+    """
+    Hands over a dry run's report: written to plan_file if there is one, otherwise printed as json. That's all that
+    goes to stdout, everything else a dry run has to say goes to stderr
+    """
+    if plan_file is not None:
+        with open(plan_file, "w", encoding="utf-8") as report_file:
+            json.dump(report, report_file, indent=2)
+        print(f"Dry run, nothing was changed. Plan written to {plan_file}", file=sys.stderr)
+    else:
+        print(json.dumps(report, indent=2))
+
 
-        # Move the file
-        sprite_dir = os.path.join("Other", "BaseSprites") if not '.' in fusion else "CustomBattlers"
-        fusion_file = os.path.join(REPO_PATH, sprite_dir, f"{fusion}.png")
-        new_fusion_file = os.path.join(REPO_PATH, sprite_dir, f"{new_fusion_name}.png")
+# === Credits csv store ===
 
-        if os.path.exists(new_fusion_file):
-            temp_file_name = os.path.join(REPO_PATH, sprite_dir, f"{new_fusion_name}_temp.png")
-            print(f"WARNING: Trying to move {fusion_file} to {new_fusion_file}, but it already exists.\nSaving {new_fusion_file} to {temp_file_name}")
-            # Replace will silently replace existing file if one exists
-            os.replace(new_fusion_file, temp_file_name)
-        os.replace(fusion_file, new_fusion_file)
+class CreditsStore:
+    """
+    Holds Sprite Credits.csv in memory for the whole run. Removals only touch the dataframe, and the file
+    is written back in one go by flush(), once the removal journal has noted what it's about to write
+    """
+    def __init__(self, csv_file_path: str = None):
+        self.csv_file_path = csv_file_path if csv_file_path is not None else os.path.join(REPO_PATH, 'Sprite Credits.csv')
+        with get_profiler().phase("csv.load") as stats:
+            # Filenames are fusion names, not numbers. Left to itself pandas reads "1.10" as the float 1.1
+            self.df = pandas.read_csv(self.csv_file_path, names=CREDITS_CSV_COLUMNS, dtype={"filename": str})
+            self.file_stat = os.stat(self.csv_file_path)
+            stats["rows"], stats["bytes"] = len(self.df), self.file_stat.st_size
+        self.unsaved_edits = 0
+
+    def apply_removal(self, removed: list, renames: dict, restored_rows: list = ()):
+        """
+        Drops the removed fusions and renames the rest in a single pass. Renames are applied all at once
+        so a chain like 1.1c -> 1.1b, 1.1b -> 1.1a can't get applied twice to the same row.
+        Rows coming back from a backup are added at the end, after the renames have made room for them
+        """
+        self.df.drop(self.df.index[self.df["filename"].isin(removed)], inplace=True)
+        renamed_rows = self.df["filename"].isin(renames.keys())
+        self.df.loc[renamed_rows, "filename"] = self.df.loc[renamed_rows, "filename"].map(renames)
+        if len(restored_rows) > 0:
+            self.df = pandas.concat([self.df, pandas.DataFrame(restored_rows, columns=CREDITS_CSV_COLUMNS)], ignore_index=True)
+        self.unsaved_edits += 1
+
+    def flush(self, csv_data: bytes = None):
+        """
+        Writes the csv out if anything changed. We write to a temp file next to the real one and swap it in,
+        so a crash partway through a write can never leave a half written csv behind
+        """
+        if self.unsaved_edits == 0:
+            return
+
+        with get_profiler().phase("csv.write") as stats:
+            csv_data = self.to_csv_bytes() if csv_data is None else csv_data
+            _write_file_atomically(self.csv_file_path, csv_data)
+            self.file_stat = os.stat(self.csv_file_path)
+            stats["rows"], stats["bytes"] = len(self.df), len(csv_data)
+        self.unsaved_edits = 0
+
+    def to_csv_bytes(self) -> bytes:
+        return self.df.to_csv(index=False, header=False).encode("utf-8")
+
+    def changed_on_disk(self) -> bool:
+        """
+        Whether the csv file is no longer the one we read (or last wrote)
+        """
+        try:
+            file_stat = os.stat(self.csv_file_path)
+        except FileNotFoundError:
+            return True
+        return (file_stat.st_mtime_ns, file_stat.st_size) != (self.file_stat.st_mtime_ns, self.file_stat.st_size)
+
+
+# === Removal journal ===
+
+class RemovalJournal:
+    """
+    Write-ahead log for applying one removal (or restore) plan. The first line holds every step up front: the sheet batchUpdate
+    chunks, the file changes (four bulk passes, see SpriteFileChanges), and the csv rewrite. After that a line is appended as each step is done.
+    Every line is flushed and fsynced before we move on, so after a crash the journal says exactly which steps
+    finished, and the one that was in flight is worked out by looking at the file, csv or sheet it touched
+    """
+    def __init__(self, path: str, header: dict):
+        self.path = path
+        self.header = header
+        self.done_steps = set()
+        self.started_steps = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def start(cls, plan: RemovalPlan, credits: "CreditsStore", sheet_changes: SheetChanges, dex_res_cache: "SheetRowIndex", credits_cache: "SheetRowIndex", path: str = None) -> "RemovalJournal":
+        path = REMOVAL_JOURNAL_PATH if path is None else path
+        if os.path.exists(path):
+            raise RuntimeError(f"A previous removal never finished (see {path}). Run with --resume to finish it first")
+
+        # The csv step is replayed against the file on disk, so that has to match what we're holding in memory
+        credits.flush()
+
+        header = {
+            "type": "plan",
+            "removed": plan.removed,
+            "renames": plan.renames,
+            "restored": plan.restored,
+            "csv_path": credits.csv_file_path,
+            "csv_sha256": _file_sha256(credits.csv_file_path),
+            "sheets": _journal_sheet_steps(sheet_changes.batcher(), dex_res_cache, credits_cache),
+            # Renamed sprites sit under temporary names tagged with this between the two rename passes
+            "file_temp_tag": os.urandom(4).hex(),
+        }
+
+        journal = cls(path, header)
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        journal._append(header)
+        return journal
+
+    @classmethod
+    def load(cls, path: str = None) -> "RemovalJournal":
+        path = REMOVAL_JOURNAL_PATH if path is None else path
+        with open(path, encoding="utf-8") as journal_file:
+            lines = journal_file.read().splitlines()
+
+        journal = None
+        for line in lines:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # Only the very last line can be cut off by a crash. It never got confirmed, so it never happened
+                continue
+            if entry["type"] == "plan":
+                journal = cls(path, entry)
+            elif entry["type"] == "started":
+                journal.started_steps[entry["step"]] = entry
+            elif entry["type"] == "done":
+                journal.done_steps.add(entry["step"])
+
+        if journal is None:
+            raise ValueError(f"{path} doesn't have a removal plan in it")
+        return journal
+
+    def plan(self) -> RemovalPlan:
+        return RemovalPlan(removed=self.header["removed"], renames=self.header["renames"], restored=self.header.get("restored"))
+
+    def is_done(self, step: str) -> bool:
+        return step in self.done_steps
+
+    def started(self, step: str, **details):
+        self.started_steps[step] = {"type": "started", "step": step, **details}
+        self._append(self.started_steps[step])
+
+    def done(self, step: str):
+        self.done_steps.add(step)
+        self._append({"type": "done", "step": step})
+
+    def finish(self):
+        """
+        Everything went through, so there's nothing left to resume
+        """
+        os.remove(self.path)
+
+    def _append(self, entry: dict):
+        line = json.dumps(entry) + "\n"
+        with get_profiler().phase("journal.write", rows=1, num_bytes=len(line)), self._lock:
+            with open(self.path, "a", encoding="utf-8") as journal_file:
+                journal_file.write(line)
+                journal_file.flush()
+                os.fsync(journal_file.fileno())
+
+
+def run_removal_journal(journal: RemovalJournal, credits: "CreditsStore", resuming: bool = False):
+    """
+    Carries out every step in a journal that isn't done yet. Each spreadsheet's chunks go out on their own thread
+    while we do the files and then the csv. Every step is safe to repeat: when resuming, a step that may have
+    happened without being confirmed is checked against the real thing first
+    """
+    sheet_futures = [get_io_pool().submit(_run_journaled_sheet_steps, journal, spreadsheet, resuming) for spreadsheet in journal.header["sheets"]]
+    try:
+        # Delete the files from the repo, rename the survivors through temporary names, then copy in anything restored
+        plan = journal.plan()
+        file_changes = SpriteFileChanges(plan.removed, plan.renames, journal.header["file_temp_tag"], {fusion: entry["source"] for fusion, entry in plan.restored.items()})
+        for step, run_pass in (("files:delete", file_changes.delete_files), ("files:stage", file_changes.stage_renames),
+                               ("files:rename", file_changes.finish_renames), ("files:restore", file_changes.restore_files)):
+            if journal.is_done(step):
+                continue
+            run_pass()
+            journal.done(step)
 
         # Modify the csv
-        csv_file_path = os.path.join(REPO_PATH, 'Sprite Credits.csv')
-        df = pandas.read_csv(csv_file_path, names=["filename", "author", "status", "tags"])
-        df.loc[df['filename'] == fusion, 'filename'] = new_fusion_name
-        df.to_csv(csv_file_path, index=False, header=False)
-
-        # Modify the google sheets
-        # Dex response
-        dex_result_rows_affected = find_sprite_in_dex_response_sheet(fusion, dex_res_cache)
-        if len(dex_result_rows_affected) < 1:
-            pass
-        else:
-            update_data = {index:new_fusion_name for index in dex_result_rows_affected}
-            update_body_data = make_sheet_update_data(DEX_RESPONSE_SHEET_NAME, update_data, DEX_SHEET_FUSION_NAME_COL)
-            dex_response_update_data.extend(update_body_data)
-
-            # Update cache
-            if dex_res_cache is not None:
-                for row in dex_result_rows_affected:
-                    dex_res_cache[row - 3] = new_fusion_name
-
-        # Credits
-        credit_rows_affected = find_sprite_in_credit_sheet(fusion, credits_cache)
-        if len(credit_rows_affected) < 1:
-            print(f"WARNING: No rows in credit sheet found for fusion {fusion}. THIS SHOULD NOT HAPPEN.")
-        else:
-            update_data = {index:new_fusion_name for index in credit_rows_affected}
-            update_body_data = make_sheet_update_data(CREDITS_CREDIT_SHEET_NAME, update_data, CREDITS_SHEET_FUSION_NAME_COL, needs_png=False)
-            credits_update_data.extend(update_body_data)
-
-            # Update cache
-            if credits_cache is not None:
-                for row in credit_rows_affected:
-                    credits_cache[row - 2] = new_fusion_name  
-    
-    # Write to sheets
-    retry_sheet_operation(run_sheet_update, DEX_SPREADSHEET_ID, dex_response_update_data)
-    retry_sheet_operation(run_sheet_update, CREDITS_SPREADSHEET_ID, credits_update_data)
-        
+        if not journal.is_done("csv"):
+            with get_profiler().phase("csv.apply", rows=len(plan.removed) + len(plan.renames) + len(plan.restored)):
+                _run_csv_step(journal, credits)
+            journal.done("csv")
+    finally:
+        # Never leave sheet writes running behind our back, even if the local work blew up
+        _wait_all(sheet_futures)
 
-def make_backup(fusions:list, username:str):
-    backup_user_dir = os.path.join(REMOVED_SPRITES_FOLDER, username)
-    if not os.path.exists(os.path.join(backup_user_dir, "Other", "BaseSprites")):
-        os.makedirs(os.path.join(backup_user_dir, "Other", "BaseSprites"))
+    problems = file_changes.verify(SpriteDirSnapshot())
+    if len(problems) > 0:
+        print("WARNING: The sprite folders don't look the way they should after the removal:\n" + "\n".join(problems))
+    journal.finish()
 
-    if not os.path.exists(os.path.join(backup_user_dir, "CustomBattlers")):
-        os.makedirs(os.path.join(backup_user_dir, "CustomBattlers"))
 
-    csv_file_path = os.path.join(REPO_PATH, 'Sprite Credits.csv')
-    df = pandas.read_csv(csv_file_path, names=["filename", "author", "status", "tags"])
-    new_df = pandas.DataFrame()
+def resume_removal(journal_path: str = None):
+    """
+    Finishes a removal that was interrupted partway through, using the journal it left behind
+    """
+    journal = RemovalJournal.load(journal_path)
+    plan = journal.plan()
+    remaining = [step for step in ("files:delete", "files:stage", "files:rename", "files:restore", "csv") if not journal.is_done(step)]
+    if len(plan.restored) > 0:
+        print(f"Resuming restore of {len(plan.restored)} sprites ({len(plan.renames)} renames). Still to do: {remaining}")
+    else:
+        print(f"Resuming removal of {len(plan.removed)} sprites ({len(plan.renames)} renames). Still to do: {remaining}")
 
-    for fusion in fusions: 
-        sprite_dir = os.path.join("Other", "BaseSprites") if not '.' in fusion else "CustomBattlers"
-        fusion_file = os.path.join(REPO_PATH, sprite_dir, f"{fusion}.png")
-        backup_file = os.path.join(backup_user_dir, sprite_dir, f"{fusion}.png")
-        shutil.copy(fusion_file, backup_file)
+    credits = CreditsStore(journal.header["csv_path"])
+    run_removal_journal(journal, credits, resuming=True)
+    print("Completed removals")
 
-        # Remove the credit line in the repo's csv
-        lil_df = df.loc[df['filename'] == fusion]
-        new_df = pandas.concat([new_df, lil_df], axis=0)
 
-    new_csv_file_path = os.path.join(backup_user_dir, 'Sprite Credits.csv')
-    new_df.to_csv(new_csv_file_path, index=False, header=False)
+def _journal_sheet_steps(batcher: "SheetBatcher", dex_res_cache: "SheetRowIndex", credits_cache: "SheetRowIndex") -> list:
+    """
+    Lays out every batchUpdate chunk for the journal. Each chunk carries a few cells that look different before and
+    after it goes through (worked out by playing the chunks against a copy of the cached columns), so a resumed
+    run can tell whether a chunk that was in flight actually landed.
+    A delete doesn't always change the row it was on (1.1a goes, and the 1.1b below it was just renamed to 1.1a),
+    so for each row a chunk touches we check the first row from there down that actually ends up different.
+    Inserted rows are blank to start with, so they check against the fusion name they end up holding
+    """
+    # (spreadsheet id, sheet id) -> [values by row, range prefix, column, first row]
+    columns = {
+        (DEX_SPREADSHEET_ID, DEX_RESPONSE_SHEET_ID): [dex_res_cache.tolist(), f"{DEX_RESPONSE_SHEET_NAME}!", DEX_SHEET_FUSION_NAME_COL, DEX_RESPONSE_NUM_HEADERS + 1],
+        (CREDITS_SPREADSHEET_ID, CREDITS_CREDIT_SHEET_ID): [credits_cache.tolist(), "", CREDITS_SHEET_FUSION_NAME_COL, CREDITS_NUM_HEADERS + 1],
+    }
+
+    def cell_value(column, row):
+        values, _, _, first_row = column
+        return values[row - first_row] if 0 <= row - first_row < len(values) else ''
+
+    sheet_steps = []
+    for spreadsheet_id, batch in batcher.batches.items():
+        chunks = []
+        for chunk in batch.chunks():
+            touched_cells = []
+            for request in chunk:
+                if "updateCells" in request:
+                    touched_cells.append((request["updateCells"]["range"]["sheetId"], request["updateCells"]["range"]["startRowIndex"] + 1))
+                else:
+                    dimension_request = request.get("deleteDimension", request.get("insertDimension"))
+                    touched_cells.append((dimension_request["range"]["sheetId"], dimension_request["range"]["startIndex"] + 1))
+            before_values = {key: list(column[0]) for key, column in columns.items() if key[0] == spreadsheet_id}
+
+            for request in chunk:
+                if "updateCells" in request:
+                    cell_range = request["updateCells"]["range"]
+                    values, _, col_letter, first_row = columns[(spreadsheet_id, cell_range["sheetId"])]
+                    # Inserted rows are written whole, updates only ever cover the fusion name column
+                    col_offset = letters_to_numeric(col_letter.lower()) - 1 - cell_range["startColumnIndex"]
+                    for row_offset, row_data in enumerate(request["updateCells"]["rows"]):
+                        if col_offset >= len(row_data["values"]):
+                            continue
+                        new_value = str(row_data["values"][col_offset]["userEnteredValue"].get("stringValue", ""))
+                        values[cell_range["startRowIndex"] + 1 - first_row + row_offset] = _flatten_fusion_list([[new_value]])[0]
+                elif "insertDimension" in request:
+                    cell_range = request["insertDimension"]["range"]
+                    values, _, _, first_row = columns[(spreadsheet_id, cell_range["sheetId"])]
+                    values[cell_range["startIndex"] + 1 - first_row:cell_range["startIndex"] + 1 - first_row] = [''] * (cell_range["endIndex"] - cell_range["startIndex"])
+                else:
+                    cell_range = request["deleteDimension"]["range"]
+                    values, _, _, first_row = columns[(spreadsheet_id, cell_range["sheetId"])]
+                    del values[cell_range["startIndex"] + 1 - first_row:cell_range["endIndex"] + 1 - first_row]
+
+            checks = []
+            for sheet_id, row in dict.fromkeys(touched_cells):
+                column = columns[(spreadsheet_id, sheet_id)]
+                before_column = [before_values[(spreadsheet_id, sheet_id)]] + column[1:]
+                last_row = column[3] + max(len(column[0]), len(before_column[0]))
+                # Rows a targeted lookup never read are None, they can't be checked so skip past them too
+                while row < last_row and (cell_value(before_column, row) == cell_value(column, row) or None in (cell_value(before_column, row), cell_value(column, row))):
+                    row += 1
+                checks.append([_column_range(column[1], column[2], row, row), cell_value(before_column, row), cell_value(column, row)])
+            chunks.append({"requests": chunk, "checks": checks})
+
+        sheet_steps.append({"spreadsheet_id": spreadsheet_id, "chunks": chunks})
+    return sheet_steps
+
+
+def _run_journaled_sheet_steps(journal: RemovalJournal, spreadsheet: dict, resuming: bool):
+    spreadsheet_id = spreadsheet["spreadsheet_id"]
+    check_next = resuming
+    for chunk_num, chunk in enumerate(spreadsheet["chunks"]):
+        step = f"sheet:{spreadsheet_id}:{chunk_num}"
+        if journal.is_done(step):
+            continue
+        # Chunks go out one at a time, so only the first one that isn't confirmed can have been in flight
+        if check_next:
+            check_next = False
+            if _journaled_chunk_landed(spreadsheet_id, chunk):
+                journal.done(step)
+                continue
+        _send_journaled_chunk(spreadsheet_id, chunk)
+        journal.done(step)
+
+
+def _send_journaled_chunk(spreadsheet_id: str, chunk: dict):
+    """
+    Sends one chunk. The scheduler already retries anything turned away before it ran (429), but a server error or
+    timeout can come back after the whole batch went through, and sending a delete again would take out the rows that
+    moved up into its place. So after one of those the check cells decide: if the chunk landed we're done, otherwise
+    it's safe to send again
+    """
+    scheduler = get_sheet_scheduler()
+    attempt = 0
+    while True:
+        try:
+            retry_sheet_operation(run_sheet_batch_update, spreadsheet_id, chunk["requests"])
+            return
+        except Exception as err:
+            attempt += 1
+            if not _is_transient_sheet_error(err) or attempt >= scheduler.max_retries:
+                raise
+            delay = scheduler.backoff_delay(attempt, _retry_after_seconds(err))
+            print(f"Error sending changes to spreadsheet {spreadsheet_id} ({_sheet_error_status(err)}): {err}. "
+                  f"Checking whether they went through in {delay:.1f}s...")
+            time.sleep(delay)
+
+        if _journaled_chunk_landed(spreadsheet_id, chunk):
+            return
+
+
+def _journaled_chunk_landed(spreadsheet_id: str, chunk: dict) -> bool:
+    """
+    Reads the check cells for a chunk: True if the sheet looks like the chunk went through, False if it looks like
+    it never did. Anything else means the sheet was changed under us, and we'd rather stop than guess
+    """
+    ranges = [check[0] for check in chunk["checks"]]
+    before = [check[1] for check in chunk["checks"]]
+    after = [check[2] for check in chunk["checks"]]
+    live = [(_flatten_fusion_list(values) + [''])[0] for values in retry_sheet_operation(_get_value_ranges_from_google_sheet, spreadsheet_id, ranges)]
+
+    if live == before and live != after:
+        return False
+    if live == after and live != before:
+        return True
+    raise RuntimeError(f"Can't tell whether an interrupted write to spreadsheet {spreadsheet_id} went through, "
+                       f"check these cells by hand: {list(zip(ranges, live))}")
+
+
+def _run_csv_step(journal: RemovalJournal, credits: "CreditsStore"):
+    """
+    Applies the plan to the csv and writes it straight out. The file is swapped in atomically, so after a crash it's
+    either exactly what we started from or exactly what we were writing, and the journal has both hashes
+    """
+    current_sha256 = _file_sha256(credits.csv_file_path)
+    started = journal.started_steps.get("csv")
+    if started is not None and current_sha256 == started["sha256"]:
+        return
+    if current_sha256 != journal.header["csv_sha256"]:
+        raise RuntimeError(f"{credits.csv_file_path} was changed since the removal started, can't safely apply it again")
+
+    plan = journal.plan()
+    credits.apply_removal(plan.removed, plan.renames, [row for entry in plan.restored.values() for row in entry["csv_rows"]])
+    csv_data = credits.to_csv_bytes()
+    # Write ahead: the journal has to know what the file will hash to before it gets written
+    journal.started("csv", sha256=hashlib.sha256(csv_data).hexdigest())
+    credits.flush(csv_data)
+
+
+# === Sprite files ===
+
+class SpriteDirSnapshot:
+    """
+    Every file name in CustomBattlers and Other/BaseSprites, from one os.scandir pass over each. Lets a whole set of
+    deletes and renames be checked without a stat per sprite
+    """
+    def __init__(self):
+        self.files = {}  # directory -> set of file names
+        for sprite_dir in SPRITE_DIRS:
+            directory = os.path.join(REPO_PATH, sprite_dir)
+            with os.scandir(directory) as entries:
+                self.files[directory] = {entry.name for entry in entries}
+
+    def exists(self, file_path: str) -> bool:
+        directory, file_name = os.path.split(file_path)
+        return file_name in self.files.get(directory, ())
+
+
+class SpriteFileChanges:
+    """
+    The file side of a removal, done as four bulk passes: delete every removed sprite, move every renamed sprite to
+    a temporary name, move every temporary name to its final name, then copy in every sprite being restored from a
+    backup ({new name: backup file}). Nothing is ever renamed onto a name that another sprite might still have, so
+    chains (1.1c -> 1.1b -> 1.1a) can't collide, whatever order they come in.
+    Each pass is safe to run again after a crash, and directories are synced once per pass rather than per file
+    """
+    def __init__(self, removed: list, renames: dict, temp_tag: str = "", restored: dict = None):
+        self.removed = removed
+        self.renames = renames
+        self.temp_tag = temp_tag
+        self.restored = restored if restored is not None else {}
+
+    def check(self, snapshot: SpriteDirSnapshot) -> list:
+        """
+        Checks the whole set against the sprite folders up front. Returns a list of problems, empty if it's all fine
+        """
+        problems = [f"{_sprite_path(fusion)} doesn't exist, can't delete it" for fusion in self.removed if not snapshot.exists(_sprite_path(fusion))]
+        problems += [f"{_sprite_path(fusion)} doesn't exist, can't rename it" for fusion in self.renames if not snapshot.exists(_sprite_path(fusion))]
+
+        # A target is fine if it's free, or if whatever is there now is going away or moving too
+        freed = set(self.removed) | set(self.renames.keys())
+        problems += [f"Renaming {fusion} to {new_fusion_name} would overwrite {_sprite_path(new_fusion_name)}"
+                     for fusion, new_fusion_name in self.renames.items()
+                     if snapshot.exists(_sprite_path(new_fusion_name)) and new_fusion_name not in freed]
+        problems += [f"{source_path} doesn't exist, can't restore {fusion} from it" for fusion, source_path in self.restored.items() if not os.path.exists(source_path)]
+        problems += [f"Restoring {fusion} would overwrite {_sprite_path(fusion)}" for fusion in self.restored
+                     if snapshot.exists(_sprite_path(fusion)) and fusion not in freed]
+        targets = collections.Counter(list(self.renames.values()) + list(self.restored.keys()))
+        problems += [f"{count} sprites would end up as {new_fusion_name}" for new_fusion_name, count in targets.items() if count > 1]
+        return problems
+
+    def delete_files(self):
+        with get_profiler().phase("file.delete", rows=len(self.removed)):
+            for fusion in self.removed:
+                try:
+                    os.remove(_sprite_path(fusion))
+                except FileNotFoundError:
+                    # Already gone from an earlier try. Nothing has been renamed onto this name yet at this point
+                    pass
+            self._sync_dirs(self.removed)
+
+    def stage_renames(self):
+        with get_profiler().phase("file.stage", rows=len(self.renames)):
+            for fusion in self.renames:
+                try:
+                    os.replace(_sprite_path(fusion), self._temp_path(fusion))
+                except FileNotFoundError:
+                    if not os.path.exists(self._temp_path(fusion)):
+                        raise
+            self._sync_dirs(self.renames.keys())
+
+    def finish_renames(self):
+        with get_profiler().phase("file.rename", rows=len(self.renames)):
+            for fusion, new_fusion_name in self.renames.items():
+                try:
+                    os.replace(self._temp_path(fusion), _sprite_path(new_fusion_name))
+                except FileNotFoundError:
+                    if not os.path.exists(_sprite_path(new_fusion_name)):
+                        raise
+            self._sync_dirs(self.renames.values())
+
+    def restore_files(self):
+        """
+        Copies the restored sprites in (cloned where the filesystem can, like backups are). Each one lands under a
+        temporary name first, so a crash can't leave half a sprite under the real one. The backup is left as it was
+        """
+        with get_profiler().phase("file.restore", rows=len(self.restored)):
+            for fusion, source_path in self.restored.items():
+                temp_path = self._temp_path(fusion)
+                if os.path.lexists(temp_path):
+                    os.remove(temp_path)
+                if not _clone_file(source_path, temp_path):
+                    shutil.copy(source_path, temp_path)
+                os.replace(temp_path, _sprite_path(fusion))
+            self._sync_dirs(self.restored.keys())
+
+    def verify(self, snapshot: SpriteDirSnapshot) -> list:
+        """
+        Checks the folders ended up right: every renamed or restored sprite at its new name, no removed sprite left
+        behind (unless something else was renamed onto its name), and no temporary names lying around
+        """
+        targets = set(self.renames.values()) | set(self.restored.keys())
+        problems = [f"{_sprite_path(new_fusion_name)} is missing" for new_fusion_name in targets if not snapshot.exists(_sprite_path(new_fusion_name))]
+        problems += [f"{_sprite_path(fusion)} is still there" for fusion in self.removed if fusion not in targets and snapshot.exists(_sprite_path(fusion))]
+        problems += [f"{os.path.join(directory, file_name)} was left behind" for directory, file_names in snapshot.files.items()
+                     for file_name in file_names if file_name.endswith(f".{self.temp_tag}.renaming")]
+        return problems
+
+    def _temp_path(self, fusion: str) -> str:
+        fusion_dir, file_name = os.path.split(_sprite_path(fusion))
+        return os.path.join(fusion_dir, f".{file_name}.{self.temp_tag}.renaming")
+
+    @staticmethod
+    def _sync_dirs(fusions):
+        """
+        Makes the renames and deletes in each touched folder durable, once per folder
+        """
+        if os.name != "posix":
+            return
+        for directory in {os.path.dirname(_sprite_path(fusion)) for fusion in fusions}:
+            dir_fd = os.open(directory, os.O_RDONLY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+
+
+# === Author index ===
+
+class AuthorIndex:
+    """
+    Maps every normalized author name to the sprites they're credited on, split into sole author sprites and
+    collabs. The author column is split on '&', and names are folded for case and accents, so finding a user is a
+    dictionary lookup rather than a regex over every row (and "Foo" no longer matches "Foobar").
+    It's saved in CACHE_FOLDER, keyed by the csv's mtime and size, so runs against an unchanged csv skip building it
+    """
+    def __init__(self, authors: dict, csv_mtime_ns: int = None, csv_size: int = None):
+        self.authors = authors  # normalized name -> (sole author filenames, collab filenames)
+        self.csv_mtime_ns = csv_mtime_ns
+        self.csv_size = csv_size
+
+    @classmethod
+    def for_credits(cls, credits: "CreditsStore") -> "AuthorIndex":
+        """
+        Loads the index for the given credits from disk if it's still fresh, otherwise builds (and saves) it
+        """
+        # If the csv has been edited in memory, the file on disk no longer describes it
+        if credits.unsaved_edits > 0:
+            return cls.build(credits.df)
+
+        index_path = cls.path()
+        csv_mtime_ns, csv_size = credits.file_stat.st_mtime_ns, credits.file_stat.st_size
+        if os.path.exists(index_path):
+            try:
+                with open(index_path, encoding="utf-8") as index_file:
+                    saved = json.load(index_file)
+                if saved["csv_mtime_ns"] == csv_mtime_ns and saved["csv_size"] == csv_size:
+                    return cls({name: tuple(sprites) for name, sprites in saved["authors"].items()}, csv_mtime_ns, csv_size)
+            except (OSError, ValueError, KeyError) as err:
+                print(f"WARNING: Couldn't read the saved author index ({err}), rebuilding it")
+
+        author_index = cls.build(credits.df, csv_mtime_ns, csv_size)
+        author_index.save(index_path)
+        return author_index
+
+    @classmethod
+    def build(cls, df: pandas.DataFrame, csv_mtime_ns: int = None, csv_size: int = None) -> "AuthorIndex":
+        credited = pandas.DataFrame({
+            "row": range(len(df)),
+            "filename": df["filename"].to_numpy(),
+            "author": df["author"].fillna("").astype(str).str.split("&").to_numpy(),
+        }).explode("author")
+
+        # There are far fewer distinct names than rows, so only normalize each one once
+        raw_names = credited["author"].fillna("")
+        credited["author"] = raw_names.map({name: normalize_author_name(name) for name in raw_names.unique()})
+        credited = credited[credited["author"] != ""]
+
+        # A sprite is a collab if more than one real person is credited on it
+        is_collaborator = ~credited["author"].isin(NON_USER_COLLABORATORS)
+        num_collaborators = is_collaborator.groupby(credited["row"]).transform("sum")
+        credited["sole"] = num_collaborators <= 1
+
+        authors = {}
+        for (author, sole), filenames in credited.groupby(["author", "sole"], sort=False)["filename"]:
+            entry = authors.setdefault(author, ([], []))
+            entry[0 if sole else 1].extend(filenames.tolist())
+        return cls(authors, csv_mtime_ns, csv_size)
+
+    @staticmethod
+    def path() -> str:
+        return os.path.join(CACHE_FOLDER, "author-index.json")
+
+    def after_removal(self, plan: "RemovalPlan", csv_stat: os.stat_result) -> "AuthorIndex":
+        """
+        The index as it would be rebuilt from the csv once the plan is applied, without reading the csv again.
+        Rows keep their order through a removal and nobody's credit changes, so sprites just drop out or get renamed
+        """
+        removed = set(plan.removed)
+        authors = {}
+        for author, sprite_lists in self.authors.items():
+            kept = tuple([plan.renames.get(sprite, sprite) for sprite in sprites if sprite not in removed] for sprites in sprite_lists)
+            if len(kept[0]) + len(kept[1]) > 0:
+                authors[author] = kept
+        return AuthorIndex(authors, csv_stat.st_mtime_ns, csv_stat.st_size)
+
+    def save(self, index_path: str = None):
+        index_path = self.path() if index_path is None else index_path
+        os.makedirs(os.path.dirname(index_path), exist_ok=True)
+        saved = {"csv_mtime_ns": self.csv_mtime_ns, "csv_size": self.csv_size, "authors": self.authors}
+        _write_file_atomically(index_path, json.dumps(saved).encode("utf-8"))
+
+    def sprites_for(self, username: str) -> tuple:
+        """
+        Returns (sole author sprites, collab sprites) for a user, as fresh lists
+        """
+        sole_author_files, collab_files = self.authors.get(normalize_author_name(username), ([], []))
+        return list(sole_author_files), list(collab_files)
+
+
+def normalize_author_name(name: str) -> str:
+    """
+    Folds an author name for matching: accents stripped (Pokémon -> pokemon), case folded and whitespace collapsed
+    """
+    decomposed = unicodedata.normalize("NFKD", name)
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return " ".join(stripped.casefold().split())
+
 
 # === Fusion name parsing helpers ===
 
@@ -288,68 +1528,261 @@ def bump_down_filename(filename: str) -> str:
     """
     Takes a fusion name and decrements it (1.1c -> 1.1b)
     """
-    trailing_chars = _fusion_trailing_chars(filename)
-    version_num = letters_to_numeric(trailing_chars) - 1
-    if version_num < 0:
+    fusion_name, version_num = parse_fusion_name(filename)
+    if version_num < 1:
         raise ValueError("Tried to bump down a file that was already base")
 
-    return filename[:-len(trailing_chars)] + numeric_to_letters(version_num)
+    return fusion_name + numeric_to_letters(version_num - 1)
 
 
-def split_list_on_removed_file(filename: str, fusions_list: list):
+def parse_fusion_name(sprite_name: str) -> tuple:
     """
-    Splits a list into 2 lists, one with fusions with a higher "version id" than the target file,
-    anf one lower
+    Splits a sprite name into its base fusion and variant number ('1.59ab' -> ('1.59', 28), '1.59' -> ('1.59', 0))
     """
-    target_sprite_number = letters_to_numeric(_fusion_trailing_chars(filename))
-    larger_files = [sprite_name for sprite_name in fusions_list if letters_to_numeric(_fusion_trailing_chars(sprite_name)) > target_sprite_number]
-    smaller_files = [sprite_name for sprite_name in fusions_list if letters_to_numeric(_fusion_trailing_chars(sprite_name)) < target_sprite_number]
-
-    return(smaller_files,larger_files)
+    match = FUSION_NAME_REGEX.fullmatch(sprite_name)
+    if match is None:
+        raise ValueError(f"{sprite_name} is not a fusion name")
+    return match.group(1), letters_to_numeric(match.group(2))
 
 
 def letters_to_numeric(letters:str) -> int:
     """
     Turns a string of lowercase letters a-z into a "base 26" (no zero)
-    int representation where a=1, b=2, ect.
+    int representation where a=1, b=2, ect. 'z' is 26, 'aa' is 27 and so on, with no limit on length
     """
-    # First, turn our letters into a numberic string.
-    # 'az' would be turned into '[1, 26]'
-    num_list = [ord(char)-96 for char in letters]
-    # Reverse it so the math with calculating the power is easier later
-    num_list.reverse()
-
     final_number = 0
-    for index in range(len(num_list)):
-        final_number += num_list[index] * pow(26, index)
+    for char in letters:
+        final_number = final_number * 26 + (ord(char) - 96)
     return final_number
 
 
 def numeric_to_letters(number:int) -> str:
     """
     Turns a "base 26" (no zero) int representation where a=1, b=2, ect.
-    into a string of lowercase letters a-z (This is making an assumpiton
-    that we won't wrap around to 3 letters, which should be safe to assume for the
-    forseable future)
+    into a string of lowercase letters a-z. 0 is the base sprite, which has no letters
     """
-    # Zero is a weird case, we're just going to manually handle that
-    if number == 0:
-        return ''
-    
-    first_letter = chr((number // 26) + 96)
-    second_letter = chr((number % 26) + 96)
+    letters = []
+    while number > 0:
+        # Because there's no zero digit, shift down by one before each step so 26 comes out as z, not a carry
+        number, remainder = divmod(number - 1, 26)
+        letters.append(chr(remainder + 97))
+    return ''.join(reversed(letters))
 
-    # Because we are doing some cursed logic where 0 is not a character in our representation, we need
-    # to handle z wraparounds semi-explicitly here (ex: c` will actuall be bz)
-    if second_letter == '`':
-        first_letter = chr( (number // 26) + 96 -1)
-        second_letter = 'z'
 
-    # Remove "leading zeros"
-    if first_letter == '`':
-        return second_letter
+def parse_fusion_names(filenames: pandas.Series) -> pandas.DataFrame:
+    """
+    parse_fusion_name over a whole column at once. Returns a frame of filename, fusion_name, letters and version_num,
+    leaving out anything that isn't a fusion name ('x1.2' and '1.1_old' don't get grouped with 1.2 and 1.1)
+    """
+    parts = filenames.dropna().astype(str).str.extract(f"^{FUSION_NAME_REGEX.pattern}$")
+    parts.columns = ["fusion_name", "letters"]
+    parts["filename"] = filenames
+    parts = parts.dropna(subset=["fusion_name"])
 
-    return first_letter + second_letter
+    # Only a handful of distinct suffixes exist (a, b, ... aa, ab), so converting each of those once is enough
+    unique_letters = parts["letters"].unique()
+    parts["version_num"] = parts["letters"].map(dict(zip(unique_letters, map(letters_to_numeric, unique_letters))))
+    return parts
+
+
+class FusionGroupIndex:
+    """
+    Every sprite name in the credits, grouped by base fusion (1.1, 1.1a, 1.1b -> 1.1) and sorted by variant number.
+    The filename column is parsed once with vectorized string ops rather than running a regex per name per lookup
+    """
+    def __init__(self, filenames: pandas.Series):
+        parts = parse_fusion_names(filenames).drop_duplicates("filename")
+        parts = parts.sort_values(["fusion_name", "version_num"], kind="stable")
+        self._version_nums = parts["version_num"].tolist()
+        self._filenames = parts["filename"].tolist()
+        # Sorted like this every group is one slice, so all we keep per group is where it starts and ends.
+        # Building a list for each of the (tens of thousands of) groups up front costs seconds, a plan only reads a few
+        fusion_names = parts["fusion_name"].reset_index(drop=True)
+        starts = fusion_names.index[fusion_names != fusion_names.shift()].tolist()
+        self._slices = dict(zip(fusion_names.iloc[starts].tolist(), zip(starts, starts[1:] + [len(fusion_names)])))
+        # Groups changed by after_plan, which replace their slice
+        self._changed_groups = {}
+
+    def variants(self, fusion_name: str) -> list:
+        """
+        Returns [(version number, sprite name)] for every variant of a base fusion, lowest first
+        """
+        if fusion_name in self._changed_groups:
+            return list(self._changed_groups[fusion_name])
+        start, end = self._slices.get(fusion_name, (0, 0))
+        return list(zip(self._version_nums[start:end], self._filenames[start:end]))
+
+    def after_plan(self, plan: "RemovalPlan") -> "FusionGroupIndex":
+        """
+        The index as it would be rebuilt from the csv once the plan is applied, without reading the csv again.
+        Only the groups the plan touches change, and the sorted pass underneath is shared with this one
+        """
+        removed = set(plan.removed)
+        changed_groups = dict(self._changed_groups)
+        for fusion_name in {_fusion_name(sprite) for sprite in plan.removed + list(plan.renames) + list(plan.restored)}:
+            sprites = [plan.renames.get(sprite, sprite) for _, sprite in self.variants(fusion_name) if sprite not in removed]
+            sprites += [sprite for sprite in plan.restored if _fusion_name(sprite) == fusion_name]
+            changed_groups[fusion_name] = sorted((parse_fusion_name(sprite)[1], sprite) for sprite in dict.fromkeys(sprites))
+
+        index = copy.copy(self)
+        index._changed_groups = changed_groups
+        return index
+
+
+# === Sheet row index ===
+
+class FenwickTree:
+    """
+    Binary indexed tree over a list of counts. Gives prefix sums and "find the k-th" in O(log n)
+    """
+    def __init__(self, counts: list):
+        self.size = len(counts)
+        self.tree = [0] + list(counts)
+        # Build in O(n) by pushing each node's total up to its parent
+        for index in range(1, self.size + 1):
+            parent = index + (index & -index)
+            if parent <= self.size:
+                self.tree[parent] += self.tree[index]
+
+    def add(self, position: int, delta: int):
+        index = position + 1
+        while index <= self.size:
+            self.tree[index] += delta
+            index += index & -index
+
+    def prefix_sum(self, position: int) -> int:
+        """
+        Sum of counts[0..position], inclusive
+        """
+        total = 0
+        index = position + 1
+        while index > 0:
+            total += self.tree[index]
+            index -= index & -index
+        return total
+
+    def find_kth(self, k: int) -> int:
+        """
+        Smallest position whose prefix sum reaches k (k starts at 1)
+        """
+        position = 0
+        step = 1 << self.size.bit_length()
+        while step > 0:
+            next_position = position + step
+            if next_position <= self.size and self.tree[next_position] < k:
+                position = next_position
+                k -= self.tree[next_position]
+            step >>= 1
+        return position
+
+
+class SheetRowIndex:
+    """
+    A cached sheet column that knows which rows every fusion is on. Values stay at the position they had when the
+    column was fetched; deleted rows are only marked dead in a Fenwick tree, so looking up a fusion and deleting
+    a row are both O(log n) and the row numbers handed out always account for the rows deleted above them.
+    Behaves like the plain list of values (len, indexing, slicing, ==) so it can be used anywhere the cache was a list.
+    A partial index (from a targeted lookup) only knows some of the rows, the rest hold None. One from a saved
+    snapshot (or kept from an earlier run) has only had its sample probes checked against the sheet
+    """
+    def __init__(self, values: list, num_headers: int = 0, partial: bool = False, from_snapshot: bool = False):
+        self.num_headers = num_headers
+        self.partial = partial
+        self.from_snapshot = from_snapshot
+        self._rebuild(values)
+
+    def find(self, fusion: str) -> list:
+        """
+        Returns the current (1-indexed) sheet rows holding the given fusion
+        """
+        return [self._row_of(position) for position in self._positions.get(fusion, [])]
+
+    def tolist(self) -> list:
+        return [self._values[position] for position in range(len(self._values)) if self._alive_at(position)]
+
+    def extend(self, values: list):
+        """
+        Adds rows to the bottom of the column. Rare enough (restores) that it just rebuilds
+        """
+        self._rebuild(self.tolist() + list(values))
+
+    def __len__(self) -> int:
+        return self._num_alive
+
+    def __iter__(self):
+        return iter(self.tolist())
+
+    def __eq__(self, other) -> bool:
+        return self.tolist() == list(other)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self._num_alive)
+            if step != 1:
+                return self.tolist()[key]
+            values = []
+            if start >= stop:
+                return values
+            position = self._position_of(start)
+            while len(values) < stop - start:
+                if self._alive_at(position):
+                    values.append(self._values[position])
+                position += 1
+            return values
+        return self._values[self._position_of(self._normalize(key))]
+
+    def __setitem__(self, key, value):
+        if isinstance(key, slice):
+            # Only happens when a revalidation patches a stretch of the column, so just rebuild
+            values = self.tolist()
+            values[key] = value
+            self._rebuild(values)
+            return
+        position = self._position_of(self._normalize(key))
+        self._unlink(position)
+        self._values[position] = value
+        bisect.insort(self._positions.setdefault(value, []), position)
+
+    def __delitem__(self, key):
+        position = self._position_of(self._normalize(key))
+        self._unlink(position)
+        self._alive.add(position, -1)
+        self._live_flags[position] = 0
+        self._num_alive -= 1
+
+    def _rebuild(self, values: list):
+        self._values = list(values)
+        self._alive = FenwickTree([1] * len(self._values))
+        self._live_flags = bytearray([1]) * len(self._values)
+        self._num_alive = len(self._values)
+        self._positions = {}
+        for position, value in enumerate(self._values):
+            if value is not None:
+                self._positions.setdefault(value, []).append(position)
+
+    def _unlink(self, position: int):
+        if self._values[position] is None:
+            return
+        positions = self._positions[self._values[position]]
+        positions.pop(bisect.bisect_left(positions, position))
+        if len(positions) == 0:
+            del self._positions[self._values[position]]
+
+    def _alive_at(self, position: int) -> bool:
+        return self._live_flags[position] == 1
+
+    def _row_of(self, position: int) -> int:
+        return self._alive.prefix_sum(position) + self.num_headers
+
+    def _position_of(self, index: int) -> int:
+        return self._alive.find_kth(index + 1)
+
+    def _normalize(self, index: int) -> int:
+        if index < 0:
+            index += self._num_alive
+        if index < 0 or index >= self._num_alive:
+            raise IndexError("sheet row index out of range")
+        return index
 
 
 # === Google Sheets helpers ===
@@ -358,194 +1791,1378 @@ def get_sprites_from_dex_response_sheet() -> list:
     """
     Gets list of fusions in the dex response sheet
     """
-    response_entry_range = f"{DEX_RESPONSE_SHEET_NAME}!{DEX_SHEET_FUSION_NAME_COL}3:{DEX_SHEET_FUSION_NAME_COL}"
     dex_results_entries = _flatten_fusion_list(
-                _get_values_from_google_sheet(DEX_SPREADSHEET_ID, response_entry_range))
+                _get_values_from_google_sheet(DEX_SPREADSHEET_ID, _dex_response_sheet_range()))
     return dex_results_entries
 
 
-def find_sprite_in_dex_response_sheet(fusion:str, cache:list = None) -> list:
+def get_dex_response_sheet_index() -> SheetRowIndex:
+    """
+    Fetches the dex response sheet into a row index, starting from the saved snapshot if there's a fresh one
+    """
+    return _load_sheet_index("dex", DEX_SPREADSHEET_ID, _dex_response_sheet_range(), DEX_RESPONSE_NUM_HEADERS,
+                             get_sprites_from_dex_response_sheet, revalidate_dex_response_cache)
+
+
+def find_sprite_in_dex_response_sheet(fusion:str, cache: SheetRowIndex = None) -> list:
     """
     Returns rows that match a given fusion name in the dex response sheet
     """
-    dex_results_entries = get_sprites_from_dex_response_sheet() if cache is None else cache
-    num_headers = 2
-    return _get_index_matching_items(fusion, dex_results_entries, num_headers)
+    dex_results_entries = get_dex_response_sheet_index() if cache is None else cache
+    return dex_results_entries.find(fusion)
 
 
 def get_sprites_from_credit_sheet() -> list:
     """
     Gets list of fusions in the credits sheet
     """
-    response_entry_range = f"{CREDITS_SHEET_FUSION_NAME_COL}2:{CREDITS_SHEET_FUSION_NAME_COL}"
     dex_results_entries = _flatten_fusion_list(
-                _get_values_from_google_sheet(CREDITS_SPREADSHEET_ID, response_entry_range))
+                _get_values_from_google_sheet(CREDITS_SPREADSHEET_ID, _credit_sheet_range()))
     return dex_results_entries
 
 
-def find_sprite_in_credit_sheet(fusion:str, cache:list = None) -> list:
+def get_credit_sheet_index() -> SheetRowIndex:
+    """
+    Fetches the credits sheet into a row index, starting from the saved snapshot if there's a fresh one
+    """
+    return _load_sheet_index("credits", CREDITS_SPREADSHEET_ID, _credit_sheet_range(), CREDITS_NUM_HEADERS,
+                             get_sprites_from_credit_sheet, revalidate_credit_cache)
+
+
+def find_sprite_in_credit_sheet(fusion:str, cache: SheetRowIndex = None) -> list:
     """
     Returns rows that match a given fusion name in the credits sheet
     """
-    credit_entries = get_sprites_from_credit_sheet() if cache is None else cache
-    num_headers = 1
-    return _get_index_matching_items(fusion, credit_entries, num_headers)
+    credit_entries = get_credit_sheet_index() if cache is None else cache
+    return credit_entries.find(fusion)
+
+
+def get_sheet_indexes() -> tuple:
+    """
+    Fetches the dex response and credits sheets at the same time. Returns (dex response index, credits index)
+    """
+    pool = get_io_pool()
+    return tuple(_wait_all([pool.submit(get_dex_response_sheet_index), pool.submit(get_credit_sheet_index)]))
+
+
+def get_sheet_indexes_for(fusions: list) -> tuple:
+    """
+    get_sheet_indexes for when we know which fusions we're after. If there are only a few of them and no fresh
+    snapshots to start from, they're looked up on the sheets instead of downloading both columns
+    """
+    if _uses_targeted_lookup(fusions):
+        return lookup_sheet_indexes(fusions)
+    return get_sheet_indexes()
+
+
+def _uses_targeted_lookup(fusions: list) -> bool:
+    # No fusions at all still needs a lookup when rows are going in at the bottom (a restore), it just finds the last row
+    return 0 < TARGETED_LOOKUP_MAX_FUSIONS and len(fusions) <= TARGETED_LOOKUP_MAX_FUSIONS and not (SheetSnapshot.recent("dex") and SheetSnapshot.recent("credits"))
+
+
+def save_sheet_snapshots(dex_res_cache: SheetRowIndex, credits_cache: SheetRowIndex):
+    """
+    Saves both cached sheets for the next run to start from. Partial ones (from a lookup) aren't worth keeping
+    """
+    if not dex_res_cache.partial:
+        SheetSnapshot("dex", DEX_SPREADSHEET_ID, _dex_response_sheet_range(), dex_res_cache.tolist()).save()
+    if not credits_cache.partial:
+        SheetSnapshot("credits", CREDITS_SPREADSHEET_ID, _credit_sheet_range(), credits_cache.tolist()).save()
+
+
+def discard_sheet_snapshots():
+    """
+    Throws away the saved sheets, for when we're about to change the real ones and might not finish
+    """
+    for name in ("dex", "credits"):
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(SheetSnapshot.path_for(name))
+
+
+def _load_sheet_index(name: str, spreadsheet_id: str, sheet_range: str, num_headers: int, fetch, revalidate) -> SheetRowIndex:
+    """
+    Builds a row index for one sheet column. If an earlier run left a fresh enough snapshot of the same range, it gets
+    checked with one request of probes (one every SHEET_SNAPSHOT_CHUNK_ROWS rows, plus the end of the column) and only
+    the stretches that differ are fetched again (the rows a removal is going to touch get probed as well, in
+    apply_removal_plan). Otherwise the whole column is downloaded. Either way the result is saved as the new snapshot
+    """
+    snapshot = SheetSnapshot.load(name, spreadsheet_id, sheet_range)
+    if snapshot is not None:
+        cache = SheetRowIndex(snapshot.values, num_headers, from_snapshot=True)
+        if revalidate(cache, num_samples=_snapshot_probe_samples(cache), warn=False):
+            SheetSnapshot(name, spreadsheet_id, sheet_range, cache.tolist()).save()
+        return cache
+
+    with get_profiler().phase(f"sheet.fetch.{name}") as stats:
+        values = retry_sheet_operation(fetch)
+        stats["rows"] = len(values)
+    SheetSnapshot(name, spreadsheet_id, sheet_range, values).save()
+    return SheetRowIndex(values, num_headers)
+
+
+def _snapshot_probe_samples(cache: SheetRowIndex) -> int:
+    return max(len(cache) // SHEET_SNAPSHOT_CHUNK_ROWS, 1)
+
+
+def _dex_response_sheet_range() -> str:
+    return f"{DEX_RESPONSE_SHEET_NAME}!{DEX_SHEET_FUSION_NAME_COL}{DEX_RESPONSE_NUM_HEADERS + 1}:{DEX_SHEET_FUSION_NAME_COL}"
+
+
+def _credit_sheet_range() -> str:
+    return f"{CREDITS_SHEET_FUSION_NAME_COL}{CREDITS_NUM_HEADERS + 1}:{CREDITS_SHEET_FUSION_NAME_COL}"
+
+
+class SheetSnapshot:
+    """
+    A sheet column saved to CACHE_FOLDER between runs, as gzipped json. It's tagged with the spreadsheet and range
+    it came from, when it was saved, and a revision (a hash of the values) so a damaged or hand edited file is
+    never trusted. There's no way to ask the sheet what changed since, so a loaded snapshot still has to be
+    checked against it (see _load_sheet_index)
+    """
+    def __init__(self, name: str, spreadsheet_id: str, sheet_range: str, values: list, saved_at: float = None):
+        self.name = name
+        self.spreadsheet_id = spreadsheet_id
+        self.sheet_range = sheet_range
+        self.values = values
+        self.saved_at = saved_at
+
+    @staticmethod
+    def path_for(name: str) -> str:
+        return os.path.join(CACHE_FOLDER, f"sheet-{name}.json.gz")
+
+    @classmethod
+    def recent(cls, name: str) -> bool:
+        """
+        Cheap guess at whether load() would find something, from the file's age alone
+        """
+        if not SHEET_SNAPSHOT_MAX_AGE_MINUTES:
+            return False
+        try:
+            return time.time() - os.path.getmtime(cls.path_for(name)) <= SHEET_SNAPSHOT_MAX_AGE_MINUTES * 60
+        except OSError:
+            return False
+
+    @staticmethod
+    def revision_of(values: list) -> str:
+        return hashlib.sha256(json.dumps(values).encode("utf-8")).hexdigest()
+
+    @classmethod
+    def load(cls, name: str, spreadsheet_id: str, sheet_range: str) -> "SheetSnapshot":
+        """
+        Returns the saved snapshot if it's for the same range and young enough to be worth checking, otherwise None
+        """
+        if not SHEET_SNAPSHOT_MAX_AGE_MINUTES:
+            return None
+        try:
+            with open(cls.path_for(name), "rb") as snapshot_file:
+                saved = json.loads(gzip.decompress(snapshot_file.read()))
+        except FileNotFoundError:
+            return None
+        except (OSError, EOFError, ValueError) as err:
+            print(f"WARNING: Couldn't read the saved {name} sheet ({err}), downloading it instead")
+            return None
+
+        if saved.get("spreadsheet_id") != spreadsheet_id or saved.get("range") != sheet_range:
+            return None
+        if time.time() - saved.get("saved_at", 0) > SHEET_SNAPSHOT_MAX_AGE_MINUTES * 60:
+            return None
+        if saved.get("revision") != cls.revision_of(saved.get("values")):
+            print(f"WARNING: The saved {name} sheet doesn't match its revision, downloading it instead")
+            return None
+        return cls(name, spreadsheet_id, sheet_range, saved["values"], saved["saved_at"])
+
+    def save(self):
+        if not SHEET_SNAPSHOT_MAX_AGE_MINUTES:
+            return
+        self.saved_at = time.time()
+        saved = {
+            "spreadsheet_id": self.spreadsheet_id,
+            "range": self.sheet_range,
+            "saved_at": self.saved_at,
+            "revision": self.revision_of(self.values),
+            "values": self.values,
+        }
+        os.makedirs(CACHE_FOLDER, exist_ok=True)
+        _write_file_atomically(self.path_for(self.name), gzip.compress(json.dumps(saved).encode("utf-8")))
+
+
+def lookup_sheet_indexes(fusions: list) -> tuple:
+    """
+    Targeted version of get_sheet_indexes: only the rows holding the given fusions (and a few below each) are known.
+    Returns (dex response index, credits index), both partial
+    """
+    pool = get_io_pool()
+    return tuple(_wait_all([pool.submit(lookup_dex_response_sheet_index, fusions), pool.submit(lookup_credit_sheet_index, fusions)]))
+
+
+def lookup_dex_response_sheet_index(fusions: list) -> SheetRowIndex:
+    return _lookup_sheet_index("dex", DEX_SPREADSHEET_ID, DEX_RESPONSE_SHEET_NAME, f"{DEX_RESPONSE_SHEET_NAME}!", DEX_SHEET_FUSION_NAME_COL, DEX_RESPONSE_NUM_HEADERS, fusions)
+
+
+def lookup_credit_sheet_index(fusions: list) -> SheetRowIndex:
+    return _lookup_sheet_index("credits", CREDITS_SPREADSHEET_ID, CREDITS_CREDIT_SHEET_NAME, "", CREDITS_SHEET_FUSION_NAME_COL, CREDITS_NUM_HEADERS, fusions)
+
+
+def _lookup_sheet_index(name: str, spreadsheet_id: str, sheet_name: str, range_prefix: str, col_letter: str, num_headers: int, fusions: list) -> SheetRowIndex:
+    """
+    Finds the rows holding the given fusions without downloading the column. The sheet does the searching: a FILTER
+    formula per fusion goes into a hidden tab and the rows come back in the response to that write. Then the rows
+    from each match down (SHEET_LOOKUP_WINDOW_ROWS of them) are read, which is what the removal journal needs to pick
+    its check cells. The result is a partial SheetRowIndex of the full column's length, None wherever we didn't look
+    """
+    first_row = num_headers + 1
+    with get_profiler().phase(f"sheet.lookup.{name}") as stats:
+        rows_by_fusion, last_row = retry_sheet_rewrite(_find_rows_in_google_sheet, spreadsheet_id, sheet_name, col_letter, first_row, fusions)
+        matched_rows = sorted(set(row for rows in rows_by_fusion.values() for row in rows))
+        windows = _contiguous_row_ranges(row for match in matched_rows for row in range(match, min(match + SHEET_LOOKUP_WINDOW_ROWS, last_row + 1)))
+        window_values = []
+        if len(windows) > 0:
+            window_ranges = [_column_range(range_prefix, col_letter, start, end) for start, end in windows]
+            window_values = retry_sheet_operation(_get_value_ranges_from_google_sheet, spreadsheet_id, window_ranges)
+        stats["rows"] = sum(end - start + 1 for start, end in windows)
+
+    values = [None] * max(last_row - num_headers, 0)
+    for (start, end), live_values in zip(windows, window_values):
+        live_values = _flatten_fusion_list(live_values)
+        values[start - first_row:end - first_row + 1] = live_values + [''] * (end - start + 1 - len(live_values))
+    cache = SheetRowIndex(values, num_headers, partial=True)
+
+    # The two reads aren't atomic, so make sure they agree with each other
+    for fusion, rows in rows_by_fusion.items():
+        if cache.find(fusion) != rows:
+            raise RuntimeError(f"Spreadsheet {spreadsheet_id} changed while we were looking up {fusion}, try again")
+    return cache
+
+
+def _find_rows_in_google_sheet(spreadsheet_id: str, sheet_name: str, col_letter: str, first_row: int, fusions: list) -> tuple:
+    """
+    Has the sheet search a column for us. Returns ({fusion: [rows]}, last row with anything in it)
+    Values are compared as the sheet shows them, same as when the column is downloaded, with or without .png
+    """
+    lookup_tab = f"{SHEET_LOOKUP_TAB_NAME} {sheet_name}"
+    column = f"'{sheet_name}'!{col_letter}{first_row}:{col_letter}"
+    formulas = [["last row", f'=IFERROR(MAX(FILTER(ROW({column}),{column}<>"")),0)']]
+    for fusion in fusions:
+        # Names go straight into a formula, so anything that isn't a plain fusion name is refused
+        if FUSION_NAME_REGEX.fullmatch(fusion) is None:
+            raise ValueError(f"{fusion} is not a fusion name")
+        formulas.append([f"'{fusion}", f'=IFERROR(TEXTJOIN(",",TRUE,FILTER(ROW({column}),(TO_TEXT({column})="{fusion}")+(TO_TEXT({column})="{fusion}.png"))),"")'])
+    lookup_range = f"'{lookup_tab}'!A1:B{len(formulas)}"
+
+    client = get_sheets_client()
+    sheet = client.spreadsheets()
+    update = sheet.values().update(spreadsheetId=spreadsheet_id, range=lookup_range, valueInputOption="USER_ENTERED", body={"values": formulas},
+                                   includeValuesInResponse=True, responseValueRenderOption="UNFORMATTED_VALUE")
+    try:
+        result = client.execute(update)
+    except HttpError as err:
+        if int(err.resp.status) != 400 or "Unable to parse range" not in str(err):
+            raise
+        # First lookup against this spreadsheet, the tab isn't there yet
+        run_sheet_batch_update(spreadsheet_id, [{"addSheet": {"properties": {"title": lookup_tab, "hidden": True}}}])
+        result = client.execute(update)
+
+    # The formulas would be recalculated on every edit to the sheet if they were left there
+    client.execute(sheet.values().clear(spreadsheetId=spreadsheet_id, range=lookup_range, body={}))
+
+    found = [row + [''] * (2 - len(row)) for row in result.get("updatedData", {}).get("values", [])]
+    found += [['', '']] * (len(formulas) - len(found))
+    last_row = int(float(found[0][1] or 0))
+    rows_by_fusion = {fusion: [int(float(row)) for row in str(matches).split(",") if row != ""] for fusion, (_, matches) in zip(fusions, found[1:])}
+    return rows_by_fusion, last_row
+
+
+def _lookup_tab_exists(spreadsheet_id: str, sheet_name: str) -> bool:
+    """
+    Whether an earlier lookup already added the hidden tab _find_rows_in_google_sheet writes to. Only reads
+    """
+    client = get_sheets_client()
+    request = client.spreadsheets().values().get(spreadsheetId=spreadsheet_id, range=f"'{SHEET_LOOKUP_TAB_NAME} {sheet_name}'!A1")
+    try:
+        retry_sheet_operation(client.execute, request)
+    except HttpError as err:
+        if int(err.resp.status) != 400 or "Unable to parse range" not in str(err):
+            raise
+        return False
+    return True
+
+
+def revalidate_sheet_indexes(dex_res_cache: SheetRowIndex, credits_cache: SheetRowIndex, dex_rows_to_check: list = (), credit_rows_to_check: list = (), num_samples: int = None) -> tuple:
+    """
+    Revalidates both cached sheets at the same time. Returns whether each one had to be fixed
+    """
+    pool = get_io_pool()
+    return tuple(_wait_all([
+        pool.submit(revalidate_dex_response_cache, dex_res_cache, dex_rows_to_check, num_samples),
+        pool.submit(revalidate_credit_cache, credits_cache, credit_rows_to_check, num_samples),
+    ]))
+
+
+def revalidate_dex_response_cache(cache: SheetRowIndex, rows_to_check: list = (), num_samples: int = None, warn: bool = True) -> bool:
+    """
+    Cheaply checks the cached dex response sheet against the live one, fixing it up if needed
+    """
+    return revalidate_sheet_cache(DEX_SPREADSHEET_ID, f"{DEX_RESPONSE_SHEET_NAME}!", DEX_SHEET_FUSION_NAME_COL, DEX_RESPONSE_NUM_HEADERS + 1, cache, rows_to_check, num_samples, warn)
+
+
+def revalidate_credit_cache(cache: SheetRowIndex, rows_to_check: list = (), num_samples: int = None, warn: bool = True) -> bool:
+    """
+    Cheaply checks the cached credits sheet against the live one, fixing it up if needed
+    """
+    return revalidate_sheet_cache(CREDITS_SPREADSHEET_ID, "", CREDITS_SHEET_FUSION_NAME_COL, CREDITS_NUM_HEADERS + 1, cache, rows_to_check, num_samples, warn)
+
+
+def revalidate_sheet_cache(spreadsheet_id: str, range_prefix: str, col_letter: str, first_row: int, cache: SheetRowIndex, rows_to_check: list = (), num_samples: int = None, warn: bool = True) -> bool:
+    """
+    Checks a cached column against the sheet without downloading the whole thing. In one request we fetch every
+    row we're about to touch, the end of the column (to catch new rows) and a handful of evenly spread samples
+    (REVALIDATE_SAMPLE_CHUNKS unless num_samples says otherwise), and compare them to the cache. If something moved,
+    only the stretch between the nearest matching probes is fetched again and patched into the cache.
+    Returns True if the cache had to be fixed
+    """
+    probes = _revalidation_probes(len(cache), first_row, rows_to_check, num_samples)
+    probe_ranges = [_column_range(range_prefix, col_letter, first_row + start, first_row + end - 1) for start, end in probes]
+    with get_profiler().phase("sheet.revalidate", rows=sum(end - start for start, end in probes)):
+        live_probes = retry_sheet_operation(_get_value_ranges_from_google_sheet, spreadsheet_id, probe_ranges)
+
+    probe_matches = []
+    for (start, end), live_values in zip(probes, live_probes):
+        live_values = _flatten_fusion_list(live_values)
+        live_values += [''] * (end - start - len(live_values))
+        cached_values = cache[start:end] + [''] * (end - start - len(cache[start:end]))
+        probe_matches.append(live_values == cached_values)
+
+    if all(probe_matches):
+        return False
+
+    # Every run of mismatched probes gets re-fetched from the end of the last good probe before it up to the start
+    # of the next good probe after it. If there is no good probe after it, everything to the end of the column
+    stale_regions = []
+    for index, matched in enumerate(probe_matches):
+        if matched or (index > 0 and not probe_matches[index - 1]):
+            continue
+        region_start = probes[index - 1][1] if index > 0 else 0
+        next_good = next((i for i in range(index, len(probes)) if probe_matches[i]), None)
+        region_end = probes[next_good][0] if next_good is not None else None
+        stale_regions.append((region_start, region_end))
+
+    region_ranges = [_column_range(range_prefix, col_letter, first_row + start, None if end is None else first_row + end - 1) for start, end in stale_regions]
+    with get_profiler().phase("sheet.refill") as stats:
+        live_regions = retry_sheet_operation(_get_value_ranges_from_google_sheet, spreadsheet_id, region_ranges)
+        stats["rows"] = sum(len(values) for values in live_regions)
+
+    # Patch from the bottom up so earlier slices keep their positions
+    for (start, end), live_values in reversed(list(zip(stale_regions, live_regions))):
+        live_values = _flatten_fusion_list(live_values)
+        if end is None:
+            cache[start:] = live_values
+        else:
+            cache[start:end] = live_values + [''] * (end - start - len(live_values))
+
+    if warn:
+        print(f"Something has happened at {datetime.datetime.now()} and the cache for {spreadsheet_id} was wrong! Re-fetched {len(stale_regions)} region(s)")
+    return True
 
 
 def _get_values_from_google_sheet(spreadsheet_id: str, sheet_range: str) -> list:
     """
     Performs a get for the given range on a google sheet
     """
-    creds = _get_google_creds()
+    client = get_sheets_client()
     try:
-        service = build("sheets", "v4", credentials=creds)
-
         # Call the Sheets API
-        sheet = service.spreadsheets()
-        result = (
+        sheet = client.spreadsheets()
+        result = client.execute(
             sheet.values()
             .get(spreadsheetId=spreadsheet_id, range=sheet_range)
-            .execute()
         )
         
         return result["values"]
 
     except HttpError as err:
         print(err)
-        raise HttpError
+        raise
 
 
-def run_sheet_delete(spreadsheet_id: str, sheet_id: str, del_rows: list):
+def _get_value_ranges_from_google_sheet(spreadsheet_id: str, sheet_ranges: list, value_render_option: str = "FORMATTED_VALUE") -> list:
     """
-    Deletes a list of rows on a given sheet
+    Performs a get for several ranges on a google sheet in a single request. Returns the values for each range,
+    in the same order as the ranges
     """
-    creds = _get_google_creds()
+    client = get_sheets_client()
+    body = {"dataFilters": [{"a1Range": sheet_range} for sheet_range in sheet_ranges], "majorDimension": "ROWS", "valueRenderOption": value_render_option}
+    try:
+        # Call the Sheets API. We use the data filter version since it's a POST, so a long list of ranges can't
+        # blow out the URL length
+        sheet = client.spreadsheets()
+        result = client.execute(sheet.values().batchGetByDataFilter(spreadsheetId=spreadsheet_id, body=body))
 
-    def make_del_dim(row: int):
-        del_dim = {
-            "deleteDimension": {
-                "range": {
-                    "sheetId": sheet_id,
-                    "dimension": "ROWS",
-                    "startIndex": row-1,
-                    "endIndex": row
-                }
-            }
-        }
-        return del_dim
-    
-    # Infuriatingly, we must make sure we delete backwards since it will process each delete one at a time
-    del_rows.sort(reverse=True)
-    del_requests = [make_del_dim(i) for i in del_rows]
-    del_body = {"requests": del_requests}
+        values_by_range = {}
+        for matched_range in result.get("valueRanges", []):
+            for data_filter in matched_range.get("dataFilters", []):
+                values_by_range[data_filter["a1Range"]] = matched_range["valueRange"].get("values", [])
+        return [values_by_range.get(sheet_range, []) for sheet_range in sheet_ranges]
 
-    try:
-        service = build("sheets", "v4", credentials=creds)
+    except HttpError as err:
+        print(err)
+        raise
+
+
+def run_sheet_batch_update(spreadsheet_id: str, requests: list):
+    """
+    Sends a list of spreadsheet requests (deleteDimension, updateCells, ect) as a single batchUpdate
+    """
+    client = get_sheets_client()
 
+    try:
         # Call the Sheets API
-        sheet = service.spreadsheets()
-        result = (
-            sheet.batchUpdate(spreadsheetId=spreadsheet_id, body=del_body).execute()
-        )
-        
+        sheet = client.spreadsheets()
+        body = {"requests": requests}
+        with get_profiler().phase("sheet.batch_update", rows=len(requests), num_bytes=len(json.dumps(body))):
+            result = client.execute(
+                sheet.batchUpdate(spreadsheetId=spreadsheet_id, body=body)
+            )
+
         return result
 
     except HttpError as err:
         print(err)
-        raise HttpError
+        raise
+
 
-def make_sheet_update_data(sheet_name: str, update_rows: dict, col_letter:str, needs_png: bool = True):
+class SheetBatch:
     """
-    Updates a cell in the given sheet
+    Every cell update, row insert and row delete for one spreadsheet. Row numbers are the 1-indexed rows as they were
+    when we read the sheet; requests() orders everything so those row numbers stay right
     """
-    def make_update_dim(row: int, value:str):
-        cell_value = f"{value}.png" if needs_png else value
-        update_data =  {
-            "range": f"{sheet_name}!{col_letter}{row}",
-            "majorDimension": "COLUMNS",
-            "values": [
-                [cell_value]
-            ]
+    def __init__(self, spreadsheet_id: str):
+        self.spreadsheet_id = spreadsheet_id
+        self.cell_updates = {}  # (sheet_id, col_letter) -> {row: value}
+        self.inserted_rows = {}  # sheet_id -> (row to insert at, [row values])
+        self.deleted_rows = {}  # sheet_id -> set of rows
+
+    def update_cells(self, sheet_id: str, col_letter: str, update_rows: dict):
+        self.cell_updates.setdefault((sheet_id, col_letter), {}).update(update_rows)
+
+    def insert_rows(self, sheet_id: str, row: int, rows: list):
+        """
+        Inserts whole rows (lists of cell values, as read with UNFORMATTED_VALUE) at the given row. Only one place
+        per sheet, and it has to be below every row that gets updated or deleted
+        """
+        if len(rows) > 0:
+            self.inserted_rows.setdefault(sheet_id, (row, []))[1].extend(rows)
+
+    def delete_rows(self, sheet_id: str, rows: list):
+        self.deleted_rows.setdefault(sheet_id, set()).update(rows)
+
+    def requests(self) -> list:
+        """
+        All updates go first since they use the original row numbers, with runs of neighbouring rows sent as one
+        multi-row block. Inserts are next, blank rows first and then their values (they're below everything else,
+        so nothing above moves). Deletes come last, with neighbouring rows merged into a single range and the ranges
+        sorted bottom up so each delete leaves the rows above it alone
+        """
+        requests = []
+        for (sheet_id, col_letter), update_rows in self.cell_updates.items():
+            col_index = letters_to_numeric(col_letter.lower()) - 1
+            for start_row, end_row in _contiguous_row_ranges(update_rows.keys(), SHEET_UPDATE_BLOCK_MAX_ROWS):
+                requests.append({
+                    "updateCells": {
+                        "range": {
+                            "sheetId": sheet_id,
+                            "startRowIndex": start_row-1,
+                            "endRowIndex": end_row,
+                            "startColumnIndex": col_index,
+                            "endColumnIndex": col_index+1
+                        },
+                        "rows": [{"values": [{"userEnteredValue": {"stringValue": update_rows[row]}}]} for row in range(start_row, end_row + 1)],
+                        "fields": "userEnteredValue"
+                    }
+                })
+
+        for sheet_id, (start_row, rows) in self.inserted_rows.items():
+            requests.append({
+                "insertDimension": {
+                    "range": {
+                        "sheetId": sheet_id,
+                        "dimension": "ROWS",
+                        "startIndex": start_row-1,
+                        "endIndex": start_row-1+len(rows)
+                    },
+                    # Picks up the formatting of the row above, so dates and the like show the same as the rest
+                    "inheritFromBefore": True
+                }
+            })
+            for block_start in range(0, len(rows), SHEET_UPDATE_BLOCK_MAX_ROWS):
+                block = rows[block_start:block_start + SHEET_UPDATE_BLOCK_MAX_ROWS]
+                requests.append({
+                    "updateCells": {
+                        "range": {
+                            "sheetId": sheet_id,
+                            "startRowIndex": start_row-1+block_start,
+                            "endRowIndex": start_row-1+block_start+len(block),
+                            "startColumnIndex": 0,
+                            "endColumnIndex": max(max(len(row) for row in block), 1)
+                        },
+                        "rows": [{"values": [{"userEnteredValue": _user_entered_value(cell)} for cell in row]} for row in block],
+                        "fields": "userEnteredValue"
+                    }
+                })
+
+        for sheet_id, rows in self.deleted_rows.items():
+            for start_row, end_row in reversed(_contiguous_row_ranges(rows)):
+                requests.append({
+                    "deleteDimension": {
+                        "range": {
+                            "sheetId": sheet_id,
+                            "dimension": "ROWS",
+                            "startIndex": start_row-1,
+                            "endIndex": end_row
+                        }
+                    }
+                })
+
+        return requests
+
+    def chunks(self, max_bytes: int = None) -> list:
+        """
+        Splits the requests into as few batchUpdate bodies as fit under the API's payload size limit.
+        Chunks have to be sent in order
+        """
+        return _chunk_by_size(self.requests(), max_bytes)
+
+
+class SheetBatcher:
+    """
+    Collects sheet writes across a whole run, one SheetBatch per spreadsheet. The journal sends them
+    (see _journal_sheet_steps)
+    """
+    def __init__(self):
+        self.batches = {}
+
+    def batch(self, spreadsheet_id: str) -> SheetBatch:
+        if spreadsheet_id not in self.batches:
+            self.batches[spreadsheet_id] = SheetBatch(spreadsheet_id)
+        return self.batches[spreadsheet_id]
+
+
+class SheetsClient:
+    """
+    One Sheets service shared by the whole process. Credentials are loaded once and only refreshed when they get
+    close to expiring, the service is built once from the discovery document bundled with googleapiclient, and
+    every thread keeps its own keep-alive HTTP connection since httplib2 connections can't be shared between threads.
+    A ready made service (like the fake one the benchmarks use) can be passed in, in which case no credentials are needed
+    """
+    def __init__(self, service=None):
+        self._lock = threading.Lock()
+        self._creds = None
+        self._service = service
+        self._own_service = service is None
+        self._thread_local = threading.local()
+
+    def credentials(self) -> Credentials:
+        with self._lock:
+            if self._creds is None:
+                self._creds = _get_google_creds()
+            elif self._needs_refresh():
+                self._creds.refresh(Request())
+                _save_google_creds(self._creds)
+            return self._creds
+
+    def spreadsheets(self):
+        if not self._own_service:
+            return self._service.spreadsheets()
+
+        creds = self.credentials()
+        with self._lock:
+            if self._service is None:
+                self._service = build("sheets", "v4", credentials=creds, static_discovery=True, cache_discovery=False)
+            return self._service.spreadsheets()
+
+    def execute(self, request):
+        """
+        Runs a request built off of spreadsheets() on this thread's connection, waiting for quota first
+        """
+        kind = _sheet_request_kind(request)
+        get_sheet_scheduler().throttle(kind)
+        try:
+            return request.execute(http=self._http() if self._own_service else None)
+        except Exception as err:
+            # Whether it's safe to send again depends on what it was, see _is_retryable_sheet_error
+            err.sheet_request_kind = kind
+            raise
+
+    def _http(self) -> AuthorizedHttp:
+        creds = self.credentials()
+        http = getattr(self._thread_local, "http", None)
+        if http is None:
+            http = AuthorizedHttp(creds, http=httplib2.Http(timeout=SHEETS_HTTP_TIMEOUT))
+            self._thread_local.http = http
+        return http
+
+    def _needs_refresh(self) -> bool:
+        if not self._creds.valid:
+            return True
+        if self._creds.expiry is None:
+            return False
+        # google-auth keeps expiry as a naive UTC datetime
+        now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+        return self._creds.expiry - now < CREDS_REFRESH_MARGIN
+
+
+_sheets_client = None
+_sheets_client_lock = threading.Lock()
+
+def get_sheets_client() -> SheetsClient:
+    """
+    Returns the process wide Sheets client, making it the first time it's needed
+    """
+    global _sheets_client
+    with _sheets_client_lock:
+        if _sheets_client is None:
+            _sheets_client = SheetsClient()
+        return _sheets_client
+
+
+def use_sheets_service(service):
+    """
+    Points every Sheets call in the process at the given service instead of the real API
+    """
+    global _sheets_client
+    with _sheets_client_lock:
+        _sheets_client = SheetsClient(service)
+
+
+def retry_sheet_operation(fun, *args):
+    """
+    Runs a sheet operation through the shared scheduler, which handles quota and retries
+    """
+    return get_sheet_scheduler().run(fun, *args)
+
+
+def retry_sheet_rewrite(fun, *args):
+    """
+    retry_sheet_operation for an operation that ends up the same however many times it runs (like a lookup, which
+    puts the same formulas in the same cells and clears them again, and only adds its tab if it isn't there yet).
+    Those get retried on server errors and timeouts as well, even though they write
+    """
+    scheduler = get_sheet_scheduler()
+    attempt = 0
+    while True:
+        try:
+            return retry_sheet_operation(fun, *args)
+        except Exception as err:
+            attempt += 1
+            if not _is_transient_sheet_error(err) or attempt >= scheduler.max_retries:
+                raise
+            delay = scheduler.backoff_delay(attempt, _retry_after_seconds(err))
+            print(f"Error running sheet operation ({_sheet_error_status(err)}): {err}. Retrying in {delay:.1f}s...")
+            time.sleep(delay)
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket. Fills at a steady rate up to a small burst, and acquire() blocks until a token is free
+    """
+    def __init__(self, rate_per_minute: float, burst: float):
+        self.rate_per_second = rate_per_minute / 60
+        self.capacity = max(burst, 1)
+        self.tokens = self.capacity
+        self.last_fill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """
+        Takes a token, sleeping until one is available. Returns how long we waited
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.last_fill) * self.rate_per_second)
+                self.last_fill = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                wait = (1 - self.tokens) / self.rate_per_second
+            time.sleep(wait)
+            waited += wait
+
+
+class SheetRequestScheduler:
+    """
+    Every Sheets call goes through here. Requests are paced by a token bucket per quota (reads and writes are
+    limited separately), and failures are only retried when they can actually succeed on a retry and sending
+    again can't do any harm: quota errors (429) for anything, and server errors (5xx) and dropped connections for
+    reads only. A write that failed like that may still have gone through. Retries back off exponentially with jitter and honour
+    Retry-After when the API sends one. Counters are kept so a run can report where its time went
+    """
+    def __init__(self, read_per_minute: float = None, write_per_minute: float = None, max_retries: int = None):
+        read_per_minute = SHEETS_READ_REQUESTS_PER_MINUTE if read_per_minute is None else read_per_minute
+        write_per_minute = SHEETS_WRITE_REQUESTS_PER_MINUTE if write_per_minute is None else write_per_minute
+        self.buckets = {
+            "read": TokenBucket(read_per_minute, read_per_minute * SHEETS_BURST_SECONDS / 60),
+            "write": TokenBucket(write_per_minute, write_per_minute * SHEETS_BURST_SECONDS / 60),
         }
-        return update_data
-    
-    update_requests = [make_update_dim(i,v) for i,v in update_rows.items()]
-    return update_requests
+        self.max_retries = NUM_SHEET_RETRIES if max_retries is None else max_retries
+        self._lock = threading.Lock()
+        self.counters = {
+            "read_requests": 0,
+            "write_requests": 0,
+            "retries": 0,
+            "failures": 0,
+            "throttle_wait_seconds": 0.0,
+            "backoff_seconds": 0.0,
+            "errors_by_status": {},
+        }
+
+    def throttle(self, kind: str):
+        """
+        Waits until the quota for this kind of request ("read" or "write") has room for one more
+        """
+        waited = self.buckets[kind].acquire()
+        get_profiler().record(f"sheet.throttle.{kind}", waited)
+        with self._lock:
+            self.counters[f"{kind}_requests"] += 1
+            self.counters["throttle_wait_seconds"] += waited
+
+    def run(self, fun, *args):
+        attempt = 0
+        while True:
+            try:
+                return fun(*args)
+            except Exception as err:
+                status = _sheet_error_status(err)
+                with self._lock:
+                    self.counters["errors_by_status"][status] = self.counters["errors_by_status"].get(status, 0) + 1
+
+                attempt += 1
+                if not _is_retryable_sheet_error(err) or attempt >= self.max_retries:
+                    with self._lock:
+                        self.counters["failures"] += 1
+                    raise
+
+                delay = self.backoff_delay(attempt, _retry_after_seconds(err))
+                with self._lock:
+                    self.counters["retries"] += 1
+                    self.counters["backoff_seconds"] += delay
+                print(f"Error running sheet operation ({status}): {err}. Retrying in {delay:.1f}s...")
+                with get_profiler().phase(f"sheet.backoff.{status}"):
+                    time.sleep(delay)
+
+    def backoff_delay(self, attempt: int, retry_after: float = None) -> float:
+        """
+        Exponential backoff with jitter, never sooner than the API asked us to wait
+        """
+        ceiling = min(SHEETS_BACKOFF_MAX_SECONDS, SHEETS_BACKOFF_BASE_SECONDS * (2 ** (attempt - 1)))
+        delay = random.uniform(ceiling / 2, ceiling)
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+
+_sheet_scheduler = None
+_sheet_scheduler_lock = threading.Lock()
+
+def get_sheet_scheduler() -> SheetRequestScheduler:
+    """
+    Returns the process wide request scheduler, making it the first time it's needed
+    """
+    global _sheet_scheduler
+    with _sheet_scheduler_lock:
+        if _sheet_scheduler is None:
+            _sheet_scheduler = SheetRequestScheduler()
+        return _sheet_scheduler
 
 
-def run_sheet_update(spreadsheet_id: str, update_requests: list):
+_io_pool = None
+_io_pool_lock = threading.Lock()
+
+def get_io_pool() -> concurrent.futures.ThreadPoolExecutor:
     """
-    Updates a cell in the given sheet
+    Thread pool for sheet I/O, so the two spreadsheets can be worked on at the same time
     """
-    creds = _get_google_creds()
+    global _io_pool
+    with _io_pool_lock:
+        if _io_pool is None:
+            _io_pool = concurrent.futures.ThreadPoolExecutor(max_workers=SHEET_IO_THREADS, thread_name_prefix="sheets")
+        return _io_pool
 
-    value_input_option = "USER_ENTERED"
-    body = {"valueInputOption": value_input_option, "data": update_requests}
 
-    try:
-        service = build("sheets", "v4", credentials=creds)
+# === Audit ===
 
-        # Call the Sheets API
-        sheet = service.spreadsheets()
-        result = (sheet.values().batchUpdate(spreadsheetId=spreadsheet_id, body=body).execute())
-        
-        return result
+def audit_sources(session: RemovalSession = None) -> dict:
+    """
+    Checks Sprite Credits.csv, the sprite files and both sheet columns against each other, with set operations
+    over the full tables instead of looking fusions up one at a time. Nothing is changed. Reports files nobody is
+    credited for, credits with no file, files in the wrong folder, names missing from either sheet, names credited
+    twice, names that don't parse, and gaps in variant letters (1.1, 1.1a, 1.1c with no 1.1b)
+    """
+    session = RemovalSession() if session is None else session
+    credits = session.load_credits()
+    dex_res_cache, credits_cache = session.sheet_indexes()
+    snapshot = SpriteDirSnapshot()
+
+    with get_profiler().phase("audit", rows=len(credits.df)):
+        csv_names = credits.df["filename"].dropna().astype(str)
+        parseable = csv_names.str.fullmatch(FUSION_NAME_REGEX)
+        dex_names = pandas.Series(dex_res_cache.tolist(), dtype=str)
+        dex_names = dex_names[dex_names != ""]
+        sheet_names = pandas.Series(credits_cache.tolist(), dtype=str)
+        sheet_names = sheet_names[sheet_names != ""]
+
+        files = pandas.concat([pandas.DataFrame({"directory": os.path.relpath(directory, REPO_PATH), "file_name": sorted(file_names)}, columns=["directory", "file_name"])
+                               for directory, file_names in snapshot.files.items()], ignore_index=True)
+        # Hidden files are ours (renames in progress, atomic writes), not sprites
+        files = files[files["file_name"].str.endswith(".png") & ~files["file_name"].str.startswith(".")]
+        files["name"] = files["file_name"].str[:-len(".png")]
+        expected_directory = files["name"].str.contains(".", regex=False).map({True: "CustomBattlers", False: os.path.join("Other", "BaseSprites")})
+        file_paths = files["directory"] + os.sep + files["file_name"]
+
+        csv_index = pandas.Index(csv_names.unique())
+        file_index = pandas.Index(files["name"].unique())
+        sheet_index = pandas.Index(sheet_names.unique())
+
+        problems = {
+            "orphan_files": sorted(file_paths[~files["name"].isin(csv_index)].tolist()),
+            "missing_files": csv_index.difference(file_index).tolist(),
+            "misplaced_files": sorted(file_paths[files["directory"] != expected_directory].tolist()),
+            "missing_from_credits_sheet": csv_index.difference(sheet_index).tolist(),
+            "credits_sheet_not_in_csv": sheet_index.difference(csv_index).tolist(),
+            "dex_responses_not_in_csv": pandas.Index(dex_names.unique()).difference(csv_index).tolist(),
+            "duplicate_csv_rows": sorted(csv_names[csv_names.duplicated()].unique().tolist()),
+            "duplicate_credits_sheet_rows": sorted(sheet_names[sheet_names.duplicated()].unique().tolist()),
+            "unparseable_names": sorted(csv_names[~parseable].unique().tolist()),
+            "variant_gaps": _variant_gaps(csv_names[parseable]),
+        }
 
-    except HttpError as err:
-        print(err)
-        raise HttpError
+    return {
+        "checked": {"csv_rows": len(csv_names), "files": len(files), "dex_response_rows": len(dex_names), "credits_sheet_rows": len(sheet_names)},
+        "summary": {name: len(found) for name, found in problems.items()},
+        "problems": problems,
+    }
 
 
-def retry_sheet_operation(fun, *args):
-    retries = NUM_SHEET_RETRIES
-    while retries > 0:
+def _variant_gaps(filenames: pandas.Series) -> dict:
+    """
+    {base fusion: [missing sprite names]} for every fusion whose variants don't run 1.1, 1.1a, 1.1b, ... without a gap
+    """
+    versions = parse_fusion_names(filenames).drop_duplicates(["fusion_name", "version_num"])
+    counts = versions.groupby("fusion_name")["version_num"].agg(["max", "count"])
+    gappy = counts.index[counts["max"] + 1 != counts["count"]]
+
+    # Only the (few) broken fusions need looking at one by one
+    gaps = {}
+    for fusion_name, present in versions[versions["fusion_name"].isin(gappy)].groupby("fusion_name")["version_num"]:
+        missing = sorted(set(range(int(present.max()) + 1)) - set(present.tolist()))
+        gaps[fusion_name] = [fusion_name + numeric_to_letters(version_num) for version_num in missing]
+    return gaps
+
+
+# === Daemon ===
+
+class RemovalDaemon:
+    """
+    Keeps a RemovalSession loaded (csv, author index, both sheets, the google client) and runs removal jobs from
+    DAEMON_QUEUE_FOLDER one after another, so a job only pays for a quick probe of the sheets before it starts.
+    A job is a file ending in .job written like a --batch file. While it runs it's renamed to .running, then to
+    .done or .failed, with everything it printed in a .log next to it. Jobs run in name order
+    """
+    def __init__(self, queue_folder: str = None):
+        self.queue_folder = DAEMON_QUEUE_FOLDER if queue_folder is None else queue_folder
+        # Nobody is watching a daemon's output to bail out, so there's no point waiting before each job
+        self.session = RemovalSession(start_delay_seconds=0)
+
+    def run(self):
+        os.makedirs(self.queue_folder, exist_ok=True)
+        self._fail_abandoned_jobs()
+        print("Loading credits and sheets...")
+        self.session.warm_up()
+        print(f"Waiting for jobs in {self.queue_folder}")
+        while True:
+            for job_path in self.pending_jobs():
+                self.run_job(job_path)
+            time.sleep(DAEMON_POLL_SECONDS)
+
+    def pending_jobs(self) -> list:
+        return sorted(os.path.join(self.queue_folder, name) for name in os.listdir(self.queue_folder) if name.endswith(".job"))
+
+    def run_job(self, job_path: str) -> bool:
+        """
+        Runs one job file against the session. Returns whether it went through
+        """
+        job_stem = job_path[:-len(".job")]
+        running_path = f"{job_stem}.running"
         try:
-            return fun(*args)
-        except BaseException as e:
-            retries -= 1
-            if retries == 0:
-                raise e
-            else:
-                print(f"Error running sheet update: {e}. Retrying...")
-                time.sleep(10)
+            os.rename(job_path, running_path)
+        except FileNotFoundError:
+            # Taken back out of the queue before we got to it
+            return False
+
+        start = time.perf_counter()
+        succeeded = False
+        with open(f"{job_stem}.log", "w", encoding="utf-8") as log_file, contextlib.redirect_stdout(log_file), contextlib.redirect_stderr(log_file):
+            try:
+                batch_sprite_deletion(read_batch_file(running_path), session=self.session)
+                succeeded = True
+            except (Exception, SystemExit):
+                # A bad line in the job makes argparse exit, that shouldn't take the daemon down with it
+                traceback.print_exc()
+        os.rename(running_path, f"{job_stem}.{'done' if succeeded else 'failed'}")
+        print(f"{os.path.basename(job_stem)}: {'done' if succeeded else 'FAILED'} in {time.perf_counter() - start:.2f}s")
+        return succeeded
+
+    def _fail_abandoned_jobs(self):
+        # Anything still marked running was cut off when the daemon last stopped
+        for name in os.listdir(self.queue_folder):
+            if name.endswith(".running"):
+                job_stem = os.path.join(self.queue_folder, name[:-len(".running")])
+                with open(f"{job_stem}.log", "a", encoding="utf-8") as log_file:
+                    log_file.write("The daemon stopped while this job was running. If it left a removal journal behind, finish it with --resume\n")
+                os.rename(os.path.join(self.queue_folder, name), f"{job_stem}.failed")
+
+
+def submit_job(job_lines: list, queue_folder: str = None, wait: bool = True) -> bool:
+    """
+    Queues a job for the daemon. Each line is written like a line of a --batch file. With wait set, blocks until
+    the daemon has run it, prints what it printed and returns whether it went through
+    """
+    queue_folder = DAEMON_QUEUE_FOLDER if queue_folder is None else queue_folder
+    os.makedirs(queue_folder, exist_ok=True)
+    job_stem = os.path.join(queue_folder, f"{datetime.datetime.now():%Y%m%d-%H%M%S-%f}-{os.urandom(2).hex()}")
+    _write_file_atomically(f"{job_stem}.job", ("\n".join(job_lines) + "\n").encode("utf-8"))
+    print(f"Queued {job_stem}.job")
+    if not wait:
+        return True
+
+    print("Waiting for the daemon to run it (Ctrl+C stops waiting, the job stays queued)...")
+    while True:
+        for result in ("done", "failed"):
+            if os.path.exists(f"{job_stem}.{result}"):
+                with open(f"{job_stem}.log", encoding="utf-8") as log_file:
+                    print(log_file.read(), end="")
+                return result == "done"
+        time.sleep(DAEMON_POLL_SECONDS)
+
+
+# === Profiling ===
+
+class RunProfiler:
+    """
+    Counts calls, rows, bytes and wall time for every step of a run, and for every fusion where a step is about a
+    single sprite. Steps are named like "csv.write" or "sheet.batch_update", and can nest (a sheet fetch includes its
+    throttle wait), so times for different steps don't add up to the whole run. report() is what --profile writes out
+    """
+    def __init__(self):
+        self.started_at = datetime.datetime.now()
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()
+        self.phases = {}
+        self.fusions = {}
+
+    @contextlib.contextmanager
+    def phase(self, name: str, fusion: str = None, rows: int = 0, num_bytes: int = 0):
+        """
+        Times the block as one call of the named step. Rows and bytes can be filled in on the yielded dict from inside
+        """
+        stats = {"rows": rows, "bytes": num_bytes}
+        start = time.perf_counter()
+        try:
+            yield stats
+        finally:
+            self.record(name, time.perf_counter() - start, fusion, stats["rows"], stats["bytes"])
+
+    def record(self, name: str, seconds: float = 0.0, fusion: str = None, rows: int = 0, num_bytes: int = 0):
+        with self._lock:
+            totals = [self.phases.setdefault(name, {"calls": 0, "seconds": 0.0, "rows": 0, "bytes": 0})]
+            if fusion is not None:
+                totals.append(self.fusions.setdefault(fusion, {}).setdefault(name, {"calls": 0, "seconds": 0.0, "rows": 0, "bytes": 0}))
+            for total in totals:
+                total["calls"] += 1
+                total["seconds"] += seconds
+                total["rows"] += rows
+                total["bytes"] += num_bytes
+
+    def report(self) -> dict:
+        with self._lock:
+            phases = json.loads(json.dumps(self.phases))
+            fusions = json.loads(json.dumps(self.fusions))
+
+        def seconds_in(prefix: str) -> float:
+            return round(sum(phase["seconds"] for name, phase in phases.items() if name.startswith(prefix)), 4)
+
+        for phase in list(phases.values()) + [step for steps in fusions.values() for step in steps.values()]:
+            phase["seconds"] = round(phase["seconds"], 4)
+
+        return {
+            "started_at": self.started_at.isoformat(timespec="seconds"),
+            "wall_seconds": round(time.perf_counter() - self._start, 4),
+            # The usual suspects for a slow run, pulled out of the phases below
+            "summary": {
+                "quota_wait_seconds": seconds_in("sheet.throttle."),
+                "backoff_seconds": seconds_in("sheet.backoff."),
+                "sheet_fetch_seconds": seconds_in("sheet.fetch."),
+                "revalidate_seconds": seconds_in("sheet.revalidate"),
+                "cache_refill_seconds": seconds_in("sheet.refill"),
+                "sheet_write_seconds": seconds_in("sheet.batch_update"),
+                "csv_seconds": seconds_in("csv."),
+                "file_seconds": seconds_in("file."),
+                "backup_seconds": seconds_in("backup."),
+            },
+            "phases": dict(sorted(phases.items())),
+            "sheet_requests": get_sheet_scheduler().counters,
+            "fusions": fusions,
+        }
+
+    def write_report(self, report_path: str):
+        with open(report_path, "w", encoding="utf-8") as report_file:
+            json.dump(self.report(), report_file, indent=2)
+
+
+_profiler = RunProfiler()
+
+def get_profiler() -> RunProfiler:
+    """
+    Returns the process wide profiler. It's always counting, --profile just decides whether the report gets written
+    """
+    return _profiler
 
 
 # === Private helpers ===
 
+def _write_file_atomically(file_path: str, data: bytes):
+    """
+    Writes to a temp file next to the target and swaps it in, so readers never see a half written file
+    """
+    fd, temp_path = tempfile.mkstemp(prefix=f".{os.path.basename(file_path)}.", suffix=".tmp", dir=os.path.dirname(file_path))
+    try:
+        with os.fdopen(fd, "wb") as temp_file:
+            temp_file.write(data)
+            temp_file.flush()
+            os.fsync(temp_file.fileno())
+        # mkstemp makes the file private, keep whatever permissions the file had before
+        if os.path.exists(file_path):
+            shutil.copymode(file_path, temp_path)
+        os.replace(temp_path, file_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def _wait_all(futures: list) -> list:
+    """
+    Waits for every future to finish, then returns their results in order (raising the first error, if any)
+    """
+    concurrent.futures.wait(futures)
+    return [future.result() for future in futures]
+
+
+def _sheet_request_kind(request) -> str:
+    """
+    Whether a request counts against the read or the write quota
+    """
+    method_id = getattr(request, "methodId", "") or ""
+    return "read" if method_id.split(".")[-1] in ("get", "batchGet", "batchGetByDataFilter", "getByDataFilter") else "write"
+
+
+def _sheet_error_status(err: Exception):
+    """
+    The HTTP status of a failed sheet call, or the exception's name if it never got a response
+    """
+    if isinstance(err, HttpError):
+        return int(err.resp.status)
+    return type(err).__name__
+
+
+def _is_retryable_sheet_error(err: Exception) -> bool:
+    """
+    Whether a failed call can just be sent again. A quota error (429) means the request was turned away before
+    anything happened, so that's always fine. Server side errors and connection problems can come back after a write
+    was already applied, and sending a row delete twice deletes the wrong rows, so those are only retried for reads.
+    Anything else (bad request, permissions, a bug on our end) will fail the same way again
+    """
+    if isinstance(err, HttpError) and int(err.resp.status) == 429:
+        return True
+    return _is_transient_sheet_error(err) and getattr(err, "sheet_request_kind", "read") == "read"
+
+
+def _is_transient_sheet_error(err: Exception) -> bool:
+    """
+    Quota errors, server side errors and connection problems, which might not happen again
+    """
+    if isinstance(err, HttpError):
+        return int(err.resp.status) in RETRYABLE_SHEET_STATUSES
+    return isinstance(err, (TimeoutError, ConnectionError, httplib2.HttpLib2Error, google.auth.exceptions.TransportError))
+
+
+def _retry_after_seconds(err: Exception) -> float:
+    """
+    How long the API asked us to wait before retrying, if it said
+    """
+    if not isinstance(err, HttpError):
+        return None
+    retry_after = err.resp.get("retry-after")
+    if retry_after is None:
+        return None
+    try:
+        return float(retry_after)
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(retry_after)
+    except (TypeError, ValueError):
+        return None
+    return max((retry_at - datetime.datetime.now(datetime.timezone.utc)).total_seconds(), 0.0)
+
+
+def _backup_sprite(fusion: str, backup_user_dir: str, link_mode: str) -> dict:
+    """
+    Puts one sprite into a backup folder and returns its manifest entry. "auto" tries a copy-on-write clone, then a
+    hard link, and only copies the bytes if neither works. The repo file is only ever removed or renamed after this,
+    never written to, so a link keeps the backup exactly as it was
+    """
+    fusion_file = _sprite_path(fusion)
+    relative_path = os.path.relpath(fusion_file, REPO_PATH)
+    backup_file = os.path.join(backup_user_dir, relative_path)
+
+    with get_profiler().phase("backup.copy", fusion=fusion, rows=1) as stats:
+        with open(fusion_file, "rb") as sprite_file:
+            sprite_data = sprite_file.read()
+        stats["bytes"] = len(sprite_data)
+
+        # A backup from an earlier run gets replaced, links can't be made over an existing file
+        if os.path.lexists(backup_file):
+            os.remove(backup_file)
+
+        method = "copy"
+        if link_mode == "auto":
+            if _clone_file(fusion_file, backup_file):
+                method = "clone"
+            else:
+                try:
+                    os.link(fusion_file, backup_file)
+                    method = "link"
+                except OSError:
+                    pass
+        if method == "copy":
+            shutil.copy(fusion_file, backup_file)
+
+    backup_stat = os.stat(backup_file)
+    return {
+        "path": relative_path,
+        "fusion": fusion,
+        "method": method,
+        "size": len(sprite_data),
+        "mtime_ns": backup_stat.st_mtime_ns,
+        "sha256": hashlib.sha256(sprite_data).hexdigest(),
+    }
+
+
+def _backup_sheet_rows(fusions: list, dex_res_cache: "SheetRowIndex", credits_cache: "SheetRowIndex") -> dict:
+    """
+    Reads every sheet row the given sprites are on, whole, in one request per spreadsheet. Returns
+    {"dex_responses": {fusion: [rows]}, "credits": {fusion: [rows]}}. Values are read unformatted (dates come back
+    as serial numbers) so a restore can put them back exactly. A row that doesn't hold the sprite we expected
+    (the sheet moved since it was cached) is left out with a warning, rather than backing up someone else's row
+    """
+    sheets = {
+        "dex_responses": (DEX_SPREADSHEET_ID, f"{DEX_RESPONSE_SHEET_NAME}!", DEX_SHEET_FUSION_NAME_COL, dex_res_cache),
+        "credits": (CREDITS_SPREADSHEET_ID, "", CREDITS_SHEET_FUSION_NAME_COL, credits_cache),
+    }
+
+    def read_rows(spreadsheet_id: str, range_prefix: str, col_letter: str, cache: "SheetRowIndex") -> dict:
+        found = [(fusion, row) for fusion in fusions for row in cache.find(fusion)]
+        if len(found) == 0:
+            return {}
+        live_rows = retry_sheet_operation(_get_value_ranges_from_google_sheet, spreadsheet_id, [f"{range_prefix}{row}:{row}" for _, row in found], "UNFORMATTED_VALUE")
+
+        col_index = letters_to_numeric(col_letter.lower()) - 1
+        rows_by_fusion = {}
+        for (fusion, row), values in zip(found, live_rows):
+            cells = values[0] if len(values) > 0 else []
+            cell = cells[col_index] if col_index < len(cells) else ''
+            # Names that look like numbers can come back as numbers, the cache already matched those by what the sheet shows
+            if not isinstance(cell, (int, float)) and _flatten_fusion_list([[str(cell)]])[0] != fusion:
+                print(f"WARNING: Row {row} of spreadsheet {spreadsheet_id} holds {cell!r} instead of {fusion}, not backing it up")
+                continue
+            rows_by_fusion.setdefault(fusion, []).append(cells)
+        return rows_by_fusion
+
+    pool = get_io_pool()
+    return dict(zip(sheets.keys(), _wait_all([pool.submit(read_rows, *sheet) for sheet in sheets.values()])))
+
+
+def _clone_file(source_path: str, target_path: str) -> bool:
+    """
+    Makes a copy-on-write clone (reflink) of a file on filesystems that support it (btrfs, xfs, ...).
+    Returns False if that isn't possible here, leaving nothing behind
+    """
+    if fcntl is None:
+        return False
+    try:
+        with open(source_path, "rb") as source_file, open(target_path, "wb") as target_file:
+            fcntl.ioctl(target_file.fileno(), FICLONE, source_file.fileno())
+        return True
+    except OSError:
+        if os.path.exists(target_path):
+            os.remove(target_path)
+        return False
+
+
+def _file_sha256(file_path: str) -> str:
+    with open(file_path, "rb") as hashed_file:
+        return hashlib.sha256(hashed_file.read()).hexdigest()
+
+
+def _sprite_path(fusion: str) -> str:
+    """
+    Where a sprite lives in the repo. Base sprites (no dot in the name) live in Other/BaseSprites
+    """
+    sprite_dir = os.path.join("Other", "BaseSprites") if not '.' in fusion else "CustomBattlers"
+    return os.path.join(REPO_PATH, sprite_dir, f"{fusion}.png")
+
+
+def _apply_with_credits(plan: RemovalPlan, credits: "CreditsStore", dex_res_cache: "SheetRowIndex", credits_cache: "SheetRowIndex"):
+    """
+    Applies a plan, loading the csv ourselves if the caller didn't hand us a credits store. The journal writes it
+    """
+    apply_removal_plan(plan, credits if credits is not None else CreditsStore(), dex_res_cache, credits_cache)
+
+
+def _check_sheets_after_run(dex_res_cache: "SheetRowIndex", credits_cache: "SheetRowIndex"):
+    """
+    Checks the caches one last time once a run has written everything, and reports what the sheets cost
+    """
+    # Bc im tired. Lookups only know the rows they were after, there's nothing to check them against
+    if TRUST_NO_CACHE and not (dex_res_cache.partial or credits_cache.partial):
+        print("Checking cache...")
+        if any(revalidate_sheet_indexes(dex_res_cache, credits_cache)):
+            save_sheet_snapshots(dex_res_cache, credits_cache)
+
+    counters = get_sheet_scheduler().counters
+    print(f"Sheets: {counters['read_requests']} reads, {counters['write_requests']} writes, {counters['retries']} retries, "
+          f"{counters['throttle_wait_seconds']:.1f}s waiting on quota, {counters['backoff_seconds']:.1f}s backing off")
+
+
+def _patch_cache(cache: "SheetRowIndex", updates: dict, deleted_rows: list, inserted: list = ()):
+    """
+    Mirrors a set of cell updates (keyed by row), then rows inserted at the bottom, then row deletes onto a cached column
+    """
+    for row, value in updates.items():
+        cache[row - cache.num_headers - 1] = value
+    if len(inserted) > 0:
+        cache.extend(inserted)
+    for row in sorted(set(deleted_rows), reverse=True):
+        del cache[row - cache.num_headers - 1]
+
+
+def _with_cell(row: list, col_letter: str, value) -> list:
+    """
+    A copy of a sheet row with one cell set, padded out with blanks if the row was shorter than that
+    """
+    col_index = letters_to_numeric(col_letter.lower()) - 1
+    row = list(row) + [''] * (col_index + 1 - len(row))
+    row[col_index] = value
+    return row
+
+
+def _user_entered_value(cell) -> dict:
+    """
+    A cell as read back with UNFORMATTED_VALUE, in the form updateCells wants it. Dates come back as serial numbers,
+    which the inherited formatting turns back into dates
+    """
+    if isinstance(cell, bool):
+        return {"boolValue": cell}
+    if isinstance(cell, (int, float)):
+        return {"numberValue": cell}
+    return {"stringValue": str(cell)}
+
+
 def _fusion_name(sprite_name: str) -> str:
-    fusion_name_regex = r'^[0-9]+\.*[0-9]*'
-    return re.findall(fusion_name_regex, sprite_name)[0]
+    # Only the leading fusion number matters here, so stray suffixes ('1.1_temp') still group with 1.1
+    match = FUSION_NAME_REGEX.match(sprite_name)
+    if match is None:
+        raise ValueError(f"{sprite_name} is not a fusion name")
+    return match.group(1)
 
 
-def _fusion_trailing_chars(sprite_name: str) -> str:
+def _revalidation_probes(cache_len: int, first_row: int, rows_to_check: list, num_samples: int = None) -> list:
     """
-    This will turn the sprite file names '1.59', '1.59a', '1.59ab' into a list of the trailing letter chars '`', 'a', 'ab'
-    We use ` for no trailing chars because it is one unicode character below a, so it will evaluate to 0
+    Picks the (start, end) cache slices revalidate_sheet_cache compares: the rows we care about, evenly spread
+    samples, and the end of the column plus a bit past it. Returned sorted and without overlaps
     """
-    trailing_chars_regex = r'[a-z]{1,2}'
-    return re.findall(trailing_chars_regex, sprite_name)[0] if len(re.findall(trailing_chars_regex, sprite_name)) > 0 else '`'
+    probes = [(row - first_row, row - first_row + 1) for row in rows_to_check]
 
+    num_samples = REVALIDATE_SAMPLE_CHUNKS if num_samples is None else num_samples
+    num_chunks = min(num_samples, cache_len // REVALIDATE_SAMPLE_ROWS)
+    for chunk in range(num_chunks):
+        start = chunk * cache_len // num_chunks
+        probes.append((start, start + REVALIDATE_SAMPLE_ROWS))
 
+    probes.append((max(cache_len - REVALIDATE_TAIL_ROWS, 0), cache_len + REVALIDATE_TAIL_ROWS))
 
-def _flatten_fusion_list(fusion_list: list) -> list:
+    merged = []
+    for start, end in sorted(probes):
+        if len(merged) > 0 and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(end, merged[-1][1]))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _column_range(range_prefix: str, col_letter: str, start_row: int, end_row: int = None) -> str:
     """
-    Flattesns nested list into a list of fusion names without training .png
+    A1 notation for part of a single column. No end row means everything to the bottom of the sheet
     """
-    return [x[:-4] if x[-4:] == ".png" else x 
-            for xs in fusion_list for x in xs]
-    
+    return f"{range_prefix}{col_letter}{start_row}:{col_letter}{'' if end_row is None else end_row}"
+
 
-def _get_index_matching_items(item:str, lst: list, offset:int = 0)-> list:
+def _contiguous_row_ranges(rows, max_rows: int = None) -> list:
     """
-    Given a list and a target item, returns a list of indicies that contain target item
+    Turns a bunch of row numbers into sorted, inclusive (start, end) ranges of neighbouring rows,
+    none of them longer than max_rows if that's given
     """
-    matched_indexes = []
-    for index,itm in enumerate(lst):
-        if itm == item:
-            matched_indexes.append(index + offset + 1)
-            
-    return matched_indexes
+    ranges = []
+    for row in sorted(set(rows)):
+        if len(ranges) > 0 and ranges[-1][1] == row - 1 and (max_rows is None or row - ranges[-1][0] < max_rows):
+            ranges[-1] = (ranges[-1][0], row)
+        else:
+            ranges.append((row, row))
+    return ranges
+
 
+def _chunk_by_size(items: list, max_bytes: int = None) -> list:
+    """
+    Splits a list of request bodies into as few lists as fit under max_bytes (SHEET_BATCH_MAX_BYTES by default)
+    once serialized. Order is kept
+    """
+    max_bytes = SHEET_BATCH_MAX_BYTES if max_bytes is None else max_bytes
+    chunks = []
+    current_chunk = []
+    current_size = 0
+    for item in items:
+        item_size = len(json.dumps(item)) + 1
+        if len(current_chunk) > 0 and current_size + item_size > max_bytes:
+            chunks.append(current_chunk)
+            current_chunk = []
+            current_size = 0
+        current_chunk.append(item)
+        current_size += item_size
+
+    if len(current_chunk) > 0:
+        chunks.append(current_chunk)
+    return chunks
+
+
+def _flatten_fusion_list(fusion_list: list) -> list:
+    """
+    Flattesns nested list into a list of fusion names without training .png
+    Blank rows come back from the API as empty lists, so they turn into '' to keep everything below them on the right row
+    """
+    return [x[:-4] if x[-4:] == ".png" else x 
+            for xs in fusion_list for x in (xs if len(xs) > 0 else [''])]
+    
 
 def _get_google_creds() -> Credentials:
     """
@@ -572,20 +3189,89 @@ def _get_google_creds() -> Credentials:
             )
             creds = flow.run_local_server(port=0)
         # Save the credentials for the next run
-        with open(token_path, "w") as token:
-            token.write(creds.to_json())
+        _save_google_creds(creds)
 
     return creds
 
 
-if __name__ == "__main__":
+def _save_google_creds(creds: Credentials):
+    """
+    Writes the creds out to token.json so the next run doesn't have to log in again
+    """
+    token_path = os.path.join(os.path.dirname(GOOGLE_CREDS_FILE_PATH), "token.json")
+    with open(token_path, "w") as token:
+        token.write(creds.to_json())
+
+
+def _make_job_parser(add_help: bool = True) -> argparse.ArgumentParser:
+    """
+    The options for a single user's removal. Shared by the command line and batch files
+    """
     parser = argparse.ArgumentParser(
                     prog='SpriteEraser',
-                    description='Removes all sprites/credits/ect for a given user.')
-    parser.add_argument('username')
+                    description='Removes all sprites/credits/ect for a given user.',
+                    add_help=add_help)
+    parser.add_argument('username', nargs='?')
     parser.add_argument('-c', '--collabs', action='store_true', help='If flag is set, will also remove all collab sprites', required=False)
     parser.add_argument('-o', '--only', nargs='+',  help='List of sprites to remove. If this is supplied, will not remove any other sprites outside of those provided.', required=False)
     parser.add_argument('-b', '--backup',  action='store_true', help='If flag is set, will save backup of user sprite info before removing', required=False)
+    return parser
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+                    prog='SpriteEraser',
+                    description='Removes all sprites/credits/ect for a given user.',
+                    parents=[_make_job_parser(add_help=False)])
+    parser.add_argument('--batch', help='File with one removal per line, written like the command line for a single user (username [-c] [-o ...] [-b]). Every user is removed in a single pass', required=False)
+    parser.add_argument('--dry-run', action='store_true', help='If flag is set, nothing is changed. Prints the full plan and what it would cost (sheet requests, cells, file moves, backup size) as JSON', required=False)
+    parser.add_argument('--plan-file', help='With --dry-run, write the JSON plan to this file instead of printing it', required=False)
+    parser.add_argument('--resume', action='store_true', help='Finish a removal that was interrupted partway through, from where it stopped', required=False)
+    parser.add_argument('--restore', nargs='+', metavar='USERNAME', help='Put the sprites from these users\' backups (made with -b) back, with their credits and sheet rows, shifting up whatever took their place. Works with --dry-run', required=False)
+    parser.add_argument('--verify-backup', metavar='USERNAME', help='Check a user\'s backup against its manifest and report anything missing or changed', required=False)
+    parser.add_argument('--audit', nargs='?', const='', metavar='REPORT_FILE', help='Check the csv, the sprite files and both sheets against each other and report anything that doesn\'t line up. Nothing is changed. The full JSON report goes to REPORT_FILE if given', required=False)
+    parser.add_argument('--daemon', action='store_true', help='Stay running with everything loaded and run removal jobs queued with --submit one after another', required=False)
+    parser.add_argument('--submit', action='store_true', help='Hand this removal (or --batch file) to the running daemon instead of doing it here, and wait for it to finish', required=False)
+    parser.add_argument('--profile', help='Write a JSON report of where the run spent its time (per step and per fusion: calls, rows, bytes, seconds) to this file', required=False)
     
     args = parser.parse_args()
-    user_sprite_deletion(args.username, args.collabs, args.only, args.backup)
+    try:
+        if args.resume:
+            resume_removal()
+        elif args.audit is not None:
+            audit = audit_sources()
+            for problem, count in audit["summary"].items():
+                print(f"{problem}: {count}")
+            if args.audit != '':
+                with open(args.audit, "w", encoding="utf-8") as report_file:
+                    json.dump(audit, report_file, indent=2)
+                print(f"Full report written to {args.audit}")
+            else:
+                print(json.dumps(audit["problems"], indent=2))
+        elif args.daemon:
+            RemovalDaemon().run()
+        elif args.submit:
+            if args.batch is not None:
+                with open(args.batch, encoding="utf-8") as batch_file:
+                    job_lines = batch_file.read().splitlines()
+            elif args.username is not None:
+                job_lines = [shlex.join([args.username] + (["-c"] if args.collabs else []) + (["-o", *args.only] if args.only else []) + (["-b"] if args.backup else []))]
+            else:
+                parser.error("a username is required unless --batch is given")
+            if not submit_job(job_lines):
+                raise SystemExit(1)
+        elif args.restore is not None:
+            restore_backups(args.restore, args.dry_run, args.plan_file)
+        elif args.verify_backup is not None:
+            problems = verify_backup(args.verify_backup)
+            print("\n".join(problems) if len(problems) > 0 else f"Backup for {args.verify_backup} is fine")
+        elif args.batch is not None:
+            batch_sprite_deletion(read_batch_file(args.batch), args.dry_run, args.plan_file)
+        elif args.username is None:
+            parser.error("a username is required unless --batch is given")
+        else:
+            user_sprite_deletion(args.username, args.collabs, args.only, args.backup, args.dry_run, args.plan_file)
+    finally:
+        # Even a failed run is worth a report, that's usually when you want one
+        if args.profile is not None:
+            get_profiler().write_report(args.profile)